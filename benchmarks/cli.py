@@ -0,0 +1,285 @@
+"""End-to-end benchmarks of the ocl CLI against local stand-ins, see stubs.py.
+
+Every scenario runs the ``ocl`` console script in a fresh process with a
+sandboxed HOME, cache and kubeconfig and reports latency percentiles and the
+peak RSS of the ocl process:
+
+* import-clusters cold/warm: ``--import-clusters`` without/with cached
+  app-interface results
+* get-token login: ``--get-token`` without a cached token (full CLI, IdP
+  probing, OAuth token request, token validation)
+* get-token revalidate: cached token which is due for validation
+* get-token cached: cached and recently validated token (fast path)
+* login: ``ocl CLUSTER NAMESPACE --command true`` (kubeconfig login, project check)
+
+Usage: python benchmarks/cli.py [--namespaces N ...] [--rounds N] [--latency MS]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from diskcache import Cache
+from stubs import (
+    REPO_ROOT,
+    ConnectProxy,
+    GraphQLStub,
+    OAuthStub,
+    certificate,
+    cluster,
+    fake_bin,
+)
+
+# The peak RSS of a process includes the memory of the process it was forked
+# from, so ocl is started by this small launcher instead of the benchmark.
+LAUNCHER = """
+import os, sys, time
+actions = [(os.POSIX_SPAWN_OPEN, 1, os.devnull, os.O_WRONLY, 0)]
+start = time.perf_counter()
+pid = os.posix_spawn(sys.argv[1], sys.argv[1:], os.environ, file_actions=actions)
+_, status, usage = os.wait4(pid, 0)
+duration = (time.perf_counter() - start) * 1000
+# ru_maxrss is in KiB on Linux and in bytes on macOS
+rss = usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+print(duration, rss, os.waitstatus_to_exitcode(status))
+"""
+DEFAULT_NAMESPACES = [100, 5_000, 50_000]
+DEFAULT_ROUNDS = 20
+COLD_ROUNDS = 5
+
+
+@dataclass
+class Result:
+    scenario: str
+    durations: list[float] = field(default_factory=list)  # milliseconds
+    max_rss: int = 0  # bytes
+    failures: int = 0
+
+    def percentile(self, p: int) -> float:
+        if len(self.durations) < 2:  # noqa: PLR2004
+            return self.durations[0] if self.durations else float("nan")
+        return statistics.quantiles(self.durations, n=100, method="inclusive")[p - 1]
+
+
+@dataclass
+class Sandbox:
+    """Isolated environment for ocl runs against the stubs."""
+
+    directory: Path
+    env: dict[str, str]
+    ocl: Path
+    log: Path
+
+    @property
+    def cache_dir(self) -> Path:
+        # appdirs: XDG_CACHE_HOME on Linux, ~/Library/Caches on macOS
+        if sys.platform == "darwin":
+            return Path(self.env["HOME"]) / "Library" / "Caches" / "ocl" / "gql_cache"
+        return Path(self.env["XDG_CACHE_HOME"]) / "ocl" / "gql_cache"
+
+    @property
+    def kubeconfig(self) -> Path:
+        return Path(self.env["HOME"]) / ".kube" / "config"
+
+    def reset_cache(self) -> None:
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def forget_tokens(self, *, validation_only: bool = False) -> None:
+        with Cache(directory=str(self.cache_dir)) as cache:
+            prefixes = ["token_validated:"]
+            if not validation_only:
+                prefixes += ["token:", "idp:"]
+            for key in list(cache.iterkeys()):
+                if str(key).startswith(tuple(prefixes)):
+                    cache.delete(key)
+
+    def run(
+        self, args: list[str], env: dict[str, str] | None = None
+    ) -> tuple[float, int, int]:
+        """Run ocl and return the duration (ms), peak RSS (bytes) and exit code."""
+        with self.log.open("a", encoding="utf-8") as log:
+            log.write(f"$ ocl {' '.join(args)}\n")
+            log.flush()
+            result = subprocess.run(
+                [sys.executable, "-S", "-c", LAUNCHER, self.ocl, *args],
+                env={**self.env, **(env or {})},
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=log,
+                check=True,
+                text=True,
+            )
+        duration, rss, returncode = result.stdout.split()
+        return float(duration), int(rss), int(returncode)
+
+
+def sandbox(
+    directory: Path, gql: GraphQLStub, proxy: ConnectProxy, certfile: Path
+) -> Sandbox:
+    home = directory / "home"
+    (home / ".kube").mkdir(parents=True)
+    bin_dir = fake_bin(directory / "bin")
+    env = {
+        key: value
+        for key, value in os.environ.items()
+        if not key.startswith("OCL_")
+        and key not in {"KUBECONFIG", "KUBERNETES_EXEC_INFO", "XDG_RUNTIME_DIR"}
+    }
+    env.update({
+        "HOME": str(home),
+        "PATH": f"{bin_dir}{os.pathsep}{os.environ['PATH']}",
+        "SHELL": "/bin/sh",
+        # for the background cache refresh (python -m openshift_cluster_login)
+        "PYTHONPATH": str(REPO_ROOT),
+        "XDG_CACHE_HOME": str(directory / "cache"),
+        "XDG_CONFIG_HOME": str(directory / "config"),
+        "XDG_RUNTIME_DIR": str(directory / "run"),
+        "OCL_APP_INTERFACE_URL": gql.url,
+        "HTTPS_PROXY": proxy.url,
+        "https_proxy": proxy.url,
+        "NO_PROXY": "127.0.0.1,localhost",
+        "no_proxy": "127.0.0.1,localhost",
+        "REQUESTS_CA_BUNDLE": str(certfile),
+    })
+    return Sandbox(
+        directory=directory, env=env, ocl=bin_dir / "ocl", log=directory / "ocl.log"
+    )
+
+
+def measure(
+    box: Sandbox,
+    scenario: str,
+    args: list[str],
+    rounds: int,
+    prepare: Callable[[], None] | None = None,
+    env: dict[str, str] | None = None,
+) -> Result:
+    result = Result(scenario)
+    for _ in range(rounds):
+        if prepare:
+            prepare()
+        duration, rss, returncode = box.run(args, env=env)
+        if returncode:
+            result.failures += 1
+            continue
+        result.durations.append(duration)
+        result.max_rss = max(result.max_rss, rss)
+    return result
+
+
+def scenarios(box: Sandbox, rounds: int) -> list[Result]:
+    name = cluster(0)["name"]
+    exec_info = json.dumps({
+        "apiVersion": "client.authentication.k8s.io/v1beta1",
+        "kind": "ExecCredential",
+        "spec": {"cluster": {"server": cluster(0)["serverUrl"]}, "interactive": False},
+    })
+    kubectl_env = {"KUBERNETES_EXEC_INFO": exec_info}
+
+    def cold_import() -> None:
+        box.reset_cache()
+        box.kubeconfig.unlink(missing_ok=True)
+
+    results = [
+        measure(
+            box, "import-clusters cold", ["--import-clusters"], COLD_ROUNDS, cold_import
+        ),
+        measure(
+            box,
+            "import-clusters warm",
+            ["--import-clusters"],
+            rounds,
+            lambda: box.kubeconfig.unlink(missing_ok=True),
+        ),
+        measure(
+            box,
+            "get-token login",
+            ["--get-token"],
+            COLD_ROUNDS,
+            box.forget_tokens,
+            env=kubectl_env,
+        ),
+        measure(
+            box,
+            "get-token revalidate",
+            ["--get-token"],
+            rounds,
+            lambda: box.forget_tokens(validation_only=True),
+            env=kubectl_env,
+        ),
+        measure(box, "get-token cached", ["--get-token"], rounds, env=kubectl_env),
+    ]
+    results.append(
+        measure(
+            box,
+            "login",
+            [name, "namespace-0", "--command", "true", "--quiet", "--no-history"],
+            rounds,
+        )
+    )
+    return results
+
+
+def report(namespaces: int, clusters: int, results: list[Result]) -> None:
+    print(f"\n{namespaces} namespaces on {clusters} clusters")
+    print(
+        f"  {'scenario':<22} {'runs':>5} {'p50':>9} {'p90':>9} {'p99':>9} {'max RSS':>9}"
+    )
+    for r in results:
+        runs = f"{len(r.durations)}" + (f"/{r.failures}!" if r.failures else "")
+        print(
+            f"  {r.scenario:<22} {runs:>5} "
+            f"{r.percentile(50):7.1f}ms {r.percentile(90):7.1f}ms {r.percentile(99):7.1f}ms "
+            f"{r.max_rss / 1024 / 1024:7.1f}MB"
+        )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--namespaces", type=int, nargs="+", default=DEFAULT_NAMESPACES)
+    parser.add_argument("--rounds", type=int, default=DEFAULT_ROUNDS)
+    parser.add_argument("--latency", type=float, default=0, help="stub latency in ms")
+    parser.add_argument("--keep", action="store_true", help="keep the sandboxes")
+    args = parser.parse_args()
+
+    failed = False
+    workdir = Path(tempfile.mkdtemp(prefix="ocl-bench-"))
+    try:
+        for namespaces in args.namespaces:
+            clusters = max(2, min(500, namespaces // 60))
+            directory = workdir / str(namespaces)
+            directory.mkdir()
+            certfile, keyfile = certificate(directory, clusters)
+            gql = GraphQLStub(namespaces, clusters, latency=args.latency / 1000)
+            oauth = OAuthStub(certfile, keyfile, latency=args.latency / 1000)
+            proxy = ConnectProxy(oauth.port)
+            for server in (gql, oauth, proxy):
+                server.start()
+            try:
+                results = scenarios(
+                    sandbox(directory, gql, proxy, certfile), args.rounds
+                )
+            finally:
+                for server in (gql, oauth, proxy):
+                    server.shutdown()
+                    server.server_close()
+            report(namespaces, clusters, results)
+            failed = failed or any(r.failures for r in results)
+        if failed:
+            print(f"\nsome runs failed, see {workdir}/*/ocl.log")
+    finally:
+        if not args.keep and not failed:
+            shutil.rmtree(workdir)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Warm-start cost of the namespace catalog: validation vs. snapshot.
+
+Without a snapshot, the raw result is loaded from the cache (a pickle) and
+validated; both are measured.
+
+Usage: python benchmarks/gql_snapshot.py [--namespaces N] [--clusters N]
+"""
+
+import argparse
+import gc
+import pickle  # noqa: S403
+import statistics
+import time
+from collections.abc import Callable
+from typing import Any
+
+from openshift_cluster_login import snapshot
+from openshift_cluster_login.gql_definitions.namespaces import NamespacesQueryData
+
+ROUNDS = 5
+
+
+def catalog(namespaces: int, clusters: int) -> dict[str, Any]:
+    """Return a synthetic raw ``Namespaces`` query result."""
+    return {
+        "namespaces": [
+            {
+                "name": f"namespace-{i}",
+                "delete": None,
+                "cluster": {"name": f"cluster-{i % clusters}"},
+            }
+            for i in range(namespaces)
+        ]
+    }
+
+
+def measure(func: Callable[[], Any]) -> float:
+    """Return the median run time in milliseconds."""
+    timings = []
+    for _ in range(ROUNDS):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--namespaces", type=int, default=20_000)
+    parser.add_argument("--clusters", type=int, default=300)
+    args = parser.parse_args()
+    namespaces, clusters = args.namespaces, args.clusters
+    raw = catalog(namespaces, clusters)
+    pickled = pickle.dumps(raw, protocol=pickle.HIGHEST_PROTOCOL)
+    data = snapshot.dumps(NamespacesQueryData(**raw))
+
+    validate_ms = measure(lambda: NamespacesQueryData(**pickle.loads(pickled)))  # noqa: S301
+    snapshot_ms = measure(lambda: snapshot.loads(data))
+    print(f"{namespaces} namespaces on {clusters} clusters")
+    print(f"  load and validate:   {validate_ms:8.1f} ms")
+    print(f"  load snapshot:       {snapshot_ms:8.1f} ms ({len(data) / 1024:.0f} KiB)")
+    print(f"  speedup:             {validate_ms / snapshot_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
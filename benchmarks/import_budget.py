@@ -0,0 +1,66 @@
+"""Check the import cost of the kubectl exec credential fast path.
+
+Usage: python benchmarks/import_budget.py [BUDGET_MS]
+"""
+
+import subprocess
+import sys
+
+FAST_PATH_MODULES = [
+    "openshift_cluster_login.entrypoint",
+    "openshift_cluster_login.exec_credential",
+]
+FORBIDDEN_MODULES = [
+    "typer",
+    "rich",
+    "textual",
+    "pydantic",
+    "pyquery",
+    "lxml",
+    "requests_gssapi",
+    "openshift_cluster_login.__main__",
+    "openshift_cluster_login.ui",
+]
+DEFAULT_BUDGET_MS = 50
+PACKAGE = "openshift_cluster_login"
+
+
+def import_times(modules: list[str]) -> dict[str, int]:
+    """Return the cumulative import time in microseconds per imported module.
+
+    Nested imports keep their ``-X importtime`` indentation.
+    """
+    code = "; ".join(f"import {m}" for m in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or line.endswith("imported package"):
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.removeprefix(" ")] = int(cumulative)
+    return times
+
+
+def main() -> int:
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_BUDGET_MS
+    times = import_times(FAST_PATH_MODULES)
+    imported = {name.strip() for name in times}
+    errors = [f"{m} must not be imported" for m in FORBIDDEN_MODULES if m in imported]
+    # top-level entries include their nested imports, interpreter startup
+    # modules (site, encodings, ...) are not ours to budget
+    total_ms = sum(us for name, us in times.items() if name.startswith(PACKAGE)) / 1000
+    print(f"fast path import time: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+    if total_ms > budget_ms:
+        errors.append("import time budget exceeded")
+    for error in errors:
+        print(f"ERROR: {error}")
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,270 @@
+"""Local stand-ins for app-interface, the cluster OAuth/API servers and oc/kubectl.
+
+* GraphQLStub: serves a synthetic catalog for the Clusters and Namespaces
+  queries.
+* OAuthStub: HTTPS server for all cluster hosts. It mimics the OAuth token
+  request form (``/oauth/authorize``, ``/oauth/token/request``), the token
+  display page (``/oauth/token/display``) and the API ``users/~`` and
+  ``projects/<name>`` endpoints.
+* ConnectProxy: ``HTTPS_PROXY`` which tunnels every host to the OAuthStub, so
+  the real cluster URLs work without DNS or /etc/hosts entries.
+* fake_bin(): directory with ``oc``, ``kubectl`` and ``ocl`` scripts to put
+  first on ``PATH``.
+
+The OAuthStub certificate is created with the ``openssl`` CLI.
+"""
+
+import http.server
+import json
+import socket
+import socketserver
+import ssl
+import subprocess
+import sys
+import threading
+import time
+from contextlib import suppress
+from pathlib import Path
+from typing import Any
+
+DOMAIN = "example.test"
+TOKEN_PREFIX = "sha256~bench-"  # noqa: S105
+REPO_ROOT = Path(__file__).resolve().parents[1]
+
+
+def cluster(i: int) -> dict[str, Any]:
+    return {
+        "name": f"bench-{i}",
+        "serverUrl": f"https://api.bench-{i}.{DOMAIN}:6443",
+        "consoleUrl": f"https://console-openshift-console.apps.bench-{i}.{DOMAIN}",
+        "auth": [{"service": "oidc"}],
+        "spec": {"hypershift": False},
+    }
+
+
+def catalog(namespaces: int, clusters: int) -> tuple[bytes, bytes]:
+    """Return the serialized Clusters and Namespaces query responses."""
+    cluster_list = [cluster(i) for i in range(clusters)]
+    namespace_list = [
+        {
+            "name": f"namespace-{i}",
+            "delete": None,
+            "cluster": {"name": f"bench-{i % clusters}"},
+        }
+        for i in range(namespaces)
+    ]
+    return (
+        json.dumps({"data": {"clusters": cluster_list}}).encode("utf-8"),
+        json.dumps({"data": {"namespaces": namespace_list}}).encode("utf-8"),
+    )
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_Server"
+
+    def reply(self, status: int, body: bytes, content_type: str) -> None:
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+
+class _Server(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler: type[_Handler], latency: float) -> None:
+        self.latency = latency
+        super().__init__(("127.0.0.1", 0), handler)
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+class _GraphQLHandler(_Handler):
+    server: "GraphQLStub"
+
+    def do_POST(self) -> None:
+        query = json.loads(self.body())["query"]
+        self.server.requests += 1
+        data = (
+            self.server.namespaces if "namespaces_v1" in query else self.server.clusters
+        )
+        self.reply(200, data, "application/json")
+
+
+class GraphQLStub(_Server):
+    def __init__(self, namespaces: int, clusters: int, latency: float = 0) -> None:
+        self.clusters, self.namespaces = catalog(namespaces, clusters)
+        self.requests = 0
+        super().__init__(_GraphQLHandler, latency)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/graphql"
+
+
+TOKEN_FORM = b"""<html><body>
+<form method="post" action="/oauth/token/display">
+<input type="hidden" name="code" value="bench-code">
+<input type="hidden" name="csrf" value="bench-csrf">
+<button type="submit">Display Token</button>
+</form>
+</body></html>"""
+
+
+class _OAuthHandler(_Handler):
+    server: "OAuthStub"
+
+    def authorized(self) -> bool:
+        return self.headers.get("Authorization", "").startswith(
+            f"Bearer {TOKEN_PREFIX}"
+        )
+
+    def do_GET(self) -> None:
+        path = self.path.split("?", 1)[0]
+        if path in {"/oauth/authorize", "/oauth/token/request"}:
+            self.reply(200, TOKEN_FORM, "text/html")
+        elif path == "/apis/user.openshift.io/v1/users/~":
+            if self.authorized():
+                user = {"kind": "User", "metadata": {"name": "bench"}}
+                self.reply(200, json.dumps(user).encode("utf-8"), "application/json")
+            else:
+                self.reply(401, b"{}", "application/json")
+        elif path.startswith("/apis/project.openshift.io/v1/projects/"):
+            if self.authorized():
+                project = {"kind": "Project", "metadata": {"name": path.split("/")[-1]}}
+                self.reply(200, json.dumps(project).encode("utf-8"), "application/json")
+            else:
+                self.reply(401, b"{}", "application/json")
+        else:
+            self.reply(404, b"not found", "text/plain")
+
+    def do_POST(self) -> None:
+        self.body()
+        self.server.logins += 1
+        host = self.headers.get("Host", "").split(":")[0]
+        page = f"<html><body><h2>Your API token is</h2><code>{TOKEN_PREFIX}{host}</code></body></html>"
+        self.reply(200, page.encode("utf-8"), "text/html")
+
+
+class OAuthStub(_Server):
+    def __init__(self, certfile: Path, keyfile: Path, latency: float = 0) -> None:
+        self.logins = 0
+        super().__init__(_OAuthHandler, latency)
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(certfile, keyfile)
+        self.socket = context.wrap_socket(self.socket, server_side=True)
+
+
+def _pipe(src: socket.socket, dst: socket.socket) -> None:
+    with suppress(OSError):
+        while data := src.recv(65536):
+            dst.sendall(data)
+    with suppress(OSError):
+        dst.shutdown(socket.SHUT_WR)
+
+
+class _ConnectHandler(socketserver.StreamRequestHandler):
+    server: "ConnectProxy"
+
+    def handle(self) -> None:
+        if not self.rfile.readline().startswith(b"CONNECT "):
+            return
+        while self.rfile.readline() not in {b"\r\n", b"\n", b""}:
+            pass
+        with socket.create_connection(("127.0.0.1", self.server.target_port)) as up:
+            self.wfile.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+            self.wfile.flush()
+            upstream = threading.Thread(
+                target=_pipe, args=(up, self.connection), daemon=True
+            )
+            upstream.start()
+            _pipe(self.connection, up)
+            upstream.join()
+
+
+class ConnectProxy(socketserver.ThreadingTCPServer):
+    """HTTPS proxy which tunnels every CONNECT to the target port."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, target_port: int) -> None:
+        self.target_port = target_port
+        super().__init__(("127.0.0.1", 0), _ConnectHandler)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def start(self) -> None:
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+
+def certificate(directory: Path, clusters: int) -> tuple[Path, Path]:
+    """Create a self-signed certificate for all cluster hosts."""
+    certfile, keyfile = directory / "cert.pem", directory / "key.pem"
+    names = [
+        f"DNS:api.bench-{i}.{DOMAIN},DNS:*.apps.bench-{i}.{DOMAIN}"
+        for i in range(clusters)
+    ]
+    config = directory / "openssl.cnf"
+    config.write_text(
+        "[req]\ndistinguished_name = dn\nx509_extensions = ext\nprompt = no\n"
+        f"[dn]\nCN = {DOMAIN}\n"
+        f"[ext]\nsubjectAltName = {','.join(names)}\n"
+        "basicConstraints = critical,CA:true\n",
+        encoding="utf-8",
+    )
+    subprocess.run(
+        [  # noqa: S607
+            "openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-days", "1", "-config", str(config),
+            "-keyout", str(keyfile), "-out", str(certfile),
+        ],
+        check=True,
+        capture_output=True,
+    )  # fmt: skip
+    return certfile, keyfile
+
+
+FAKE_OC = """#!/bin/sh
+# fake oc; ocl writes the kubeconfig itself, see kube_login()
+[ "$1" = "project" ] && [ "$2" = "-q" ] && echo default
+exit 0
+"""
+FAKE_KUBECTL = """#!/bin/sh
+exit 0
+"""
+OCL = f"""#!{sys.executable}
+import sys
+
+sys.path.insert(0, {str(REPO_ROOT)!r})
+from openshift_cluster_login.entrypoint import main
+
+sys.exit(main())
+"""
+
+
+def fake_bin(directory: Path) -> Path:
+    """Create fake oc and kubectl binaries and an ocl script of this checkout."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, script in {"oc": FAKE_OC, "kubectl": FAKE_KUBECTL, "ocl": OCL}.items():
+        path = directory / name
+        path.write_text(script, encoding="utf-8")
+        path.chmod(0o755)
+    return directory
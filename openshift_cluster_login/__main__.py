@@ -1,59 +1,100 @@
+import atexit
 import builtins
 import copy
+import fnmatch
 import hashlib
 import json
 import logging
 import os
+import re
 import shlex
-import shutil
 import subprocess
 import sys
-import tempfile
+import threading
+import time
 import webbrowser
-from collections.abc import Generator
-from datetime import UTC, datetime, timedelta
+from collections.abc import Callable, Generator
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, suppress
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any
+from typing import Any, TypeVar
 
 import requests
 import typer
-from appdirs import AppDirs
-from diskcache import Cache
-from flufl.lock import Lock
-from pyquery import PyQuery as pq  # noqa: N813
-from requests_gssapi import HTTPKerberosAuth
+from flufl.lock import Lock, TimeOutError
+from pydantic import BaseModel
 from rich import print as rich_print
-from rich.progress import (
-    Progress,
-    SpinnerColumn,
-    TextColumn,
-)
 from rich.prompt import Prompt
 from rich.text import Text
 
+from openshift_cluster_login import completion, snapshot, tracing
+from openshift_cluster_login.cluster_index import (
+    indexed_cluster_names,
+    is_unknown_server,
+    lookup_server,
+    normalize_server_url,
+    remember_unknown_server,
+    update_cluster_index,
+    user_clusters_source,
+)
+from openshift_cluster_login.exec_credential import (
+    TOKEN_VALIDATION_TTL,
+    exec_credential,
+    exec_info_server,
+    token_key,
+    token_user,
+    validate_token,
+)
+from openshift_cluster_login.favorites import Favorites
+from openshift_cluster_login.gql_definitions.clusters import (
+    DEFINITION as CLUSTERS_DEFINITION,
+)
 from openshift_cluster_login.gql_definitions.clusters import query as clusters_query
 from openshift_cluster_login.gql_definitions.fragments.cluster import Cluster
-from openshift_cluster_login.gql_definitions.namespaces import NamespaceV1
+from openshift_cluster_login.gql_definitions.namespaces import (
+    DEFINITION as NAMESPACES_DEFINITION,
+)
 from openshift_cluster_login.gql_definitions.namespaces import (
     query as namespaces_query,
 )
+from openshift_cluster_login.gql_definitions.namespaces_by_cluster import (
+    DEFINITION as NAMESPACES_BY_CLUSTER_DEFINITION,
+)
+from openshift_cluster_login.gql_definitions.namespaces_by_cluster import (
+    query as namespaces_by_cluster_query,
+)
+from openshift_cluster_login.storage import (
+    agent_socket,
+    cache,
+    cluster_lock,
+    completion_index_file,
+)
+
+T = TypeVar("T", bound=BaseModel)
+log = logging.getLogger(__name__)
+
+GQL_CACHE_TIMEOUT = 60  # minutes; refresh in the background afterwards
+GQL_CACHE_MAX_AGE = 7 * 24 * 60  # minutes; don't use older results at all
+GQL_REFRESH_KEY = "gql_refresh"
+GQL_REFRESH_TIMEOUT = 60  # seconds
+IDP_CACHE_TIMEOUT = 7 * 24 * 60 * 60  # seconds; probe IdPs again afterwards
+LOGIN_TIMEOUT = 10  # seconds; per request of a Kerberos login
+PREFETCH_JOBS = 8
+
+
+@dataclass(frozen=True, slots=True)
+class ClusterNamespace:
+    name: str
+    cluster: Cluster
 
-from .ui import Namespace
-from .ui import app as ui_app
 
-appdirs = AppDirs("ocl", "ca-net")
-lock_file_name = Path(tempfile.gettempdir()) / "ocl.lock"
-lock = Lock(str(lock_file_name), lifetime=60, default_timeout=65)
-cache = Cache(directory=str(Path(appdirs.user_cache_dir) / "gql_cache"))
-user_config_dir = Path(appdirs.user_config_dir)
-user_config_dir.mkdir(parents=True, exist_ok=True)
-history_file = user_config_dir / "history"
-history_file.touch()
+class InteractiveLoginRequiredError(Exception):
+    """The cluster needs a manual login, but prompting isn't possible."""
 
-EXEC_CREDENTIAL_TTL = 5 * 60  # seconds; how long kubectl caches the token in-memory
-TOKEN_VALIDATION_TTL = 5 * 60  # seconds; how often to re-validate via oc whoami
 
-star_file = user_config_dir / "star.json"
+class LoginError(Exception):
+    """The API server rejected the token."""
 
 
 BANNER = """
@@ -99,13 +140,14 @@ def get_var(var_name: str, default: Any = None, *, hidden: bool = False) -> str:
     return Prompt.ask(f"Enter OCL_{var_name}", password=hidden)
 
 
+def has_var(var_name: str) -> bool:
+    """Return True if get_var() doesn't need to prompt for the variable."""
+    env_var = f"OCL_{var_name}"
+    return f"{env_var}_COMMAND" in os.environ or env_var in os.environ
+
+
 def select_cluster(cluster_name: str) -> Cluster:
-    clusters = clusters_from_app_interface()
-    # user defined clusters
-    clusters += [
-        Cluster(**c) for c in json.loads(get_var("USER_CLUSTERS", default="[]"))
-    ]
-    clusters_dict = {c.name: c for c in clusters}
+    clusters_dict = {c.name: c for c in all_clusters()}
     if cluster_name not in clusters_dict:
         print(
             f"[bold red]Cluster [bold green]{cluster_name}[/bold green] not found. Available clusters:[/bold red]",
@@ -117,35 +159,85 @@ def select_cluster(cluster_name: str) -> Cluster:
     return clusters_dict[cluster_name]
 
 
-def select_namespace(*, history_enabled: bool) -> NamespaceV1:
-    namespaces_dict = {
-        (ns.name, ns.cluster.name): ns for ns in namespaces_from_app_interface()
-    }
-    ui_app.last_selected = (
-        history_file.read_text(encoding="utf-8").strip() if history_enabled else ""
-    )
-    stars = (
-        json.loads(star_file.read_text(encoding="utf-8")) if star_file.exists() else []
-    )
-    ui_app.namespaces = [
-        Namespace(
-            namespace=namespace,
-            cluster=cluster,
-            starred=[namespace, cluster] in stars,
+def select_namespace(
+    *, history_enabled: bool, idps: list[str] | None = None
+) -> ClusterNamespace:
+    """Let the user pick a namespace.
+
+    With idps, the cluster of the highlighted namespace is logged in to in the
+    background (see warm_up_login()), so the login is usually done by the time
+    the namespace is selected.
+    """
+    from openshift_cluster_login.ui import Namespace, OclApp
+
+    namespaces_dict: dict[tuple[str, str], ClusterNamespace] = {}
+    clusters: dict[str, Cluster] = {}
+    warmed_up: set[str] = set()
+    favorites = Favorites.load()
+
+    def ui_namespaces(namespaces: list[ClusterNamespace]) -> list[Namespace]:
+        # the UI might select a namespace of either list
+        namespaces_dict.update({(ns.name, ns.cluster.name): ns for ns in namespaces})
+        clusters.update({ns.cluster.name: ns.cluster for ns in namespaces})
+        now = time.time()
+        return [
+            Namespace(
+                namespace=ns.name,
+                cluster=ns.cluster.name,
+                starred=(ns.name, ns.cluster.name) in favorites.stars,
+                frecency=favorites.frecency((ns.name, ns.cluster.name), now),
+            )
+            for ns in namespaces
+        ]
+
+    def warm_up(cluster_name: str) -> None:
+        if idps is None or cluster_name in warmed_up or cluster_name not in clusters:
+            return
+        warmed_up.add(cluster_name)
+        # a daemon thread: ocl must not wait for a slow login of a cluster the
+        # user didn't pick; a cluster lock it might leave behind expires
+        threading.Thread(
+            target=warm_up_login,
+            args=(clusters[cluster_name], idps),
+            name=f"warm-up {cluster_name}",
+            daemon=True,
+        ).start()
+
+    ui_app = OclApp(watch_css=True, css_path=os.environ.get("OCL_CSS_PATH", None))
+    ui_app.last_selected = favorites.last_selected() if history_enabled else ""
+    ui_app.warm_up = warm_up
+    cached = gql_cached(CLUSTERS_DEFINITION, NAMESPACES_DEFINITION)
+    if cached != "fresh" and not has_var("APP_INTERFACE_URL"):
+        # fetching prompts for the URL, which can't happen in a UI worker;
+        # prompt and fetch before the UI starts
+        ui_app.namespaces = ui_namespaces(refreshed_namespaces())
+    else:
+        # start with the cached namespaces, if any, and refresh them in the UI
+        refreshing = cached == "stale" and cache().add(
+            # no background refresh, this process refreshes the cache
+            GQL_REFRESH_KEY,
+            os.getpid(),
+            expire=GQL_REFRESH_TIMEOUT,
         )
-        for namespace, cluster in namespaces_dict
-    ]
-    ui_app.run()
-    star_file.write_text(
-        json.dumps(
-            [(ns.namespace, ns.cluster) for ns in ui_app.namespaces if ns.starred],
-            indent=2,
-        ),
-        encoding="utf-8",
-    )
-    if not ui_app.selected_namespace or not ui_app.selected_cluster:
+        ui_app.namespaces = (
+            ui_namespaces(namespaces_from_app_interface()) if cached else []
+        )
+        # a stale cache another process is refreshing already will do
+        if cached is None or refreshing:
+            ui_app.load_namespaces = lambda: ui_namespaces(
+                refreshed_namespaces(release=refreshing)
+            )
+    with tracing.span("ui", namespaces=len(namespaces_dict)):
+        ui_app.run()
+    # stars of namespaces which aren't listed (anymore) are kept
+    for ns in ui_app.namespaces:
+        favorites.star((ns.namespace, ns.cluster), starred=ns.starred)
+    selected = (ui_app.selected_namespace, ui_app.selected_cluster)
+    if all(selected):
+        favorites.visit(selected)
+    favorites.save()
+    if not all(selected):
         sys.exit(0)
-    history_file.write_text(ui_app.selected_namespace, encoding="utf-8")
     return namespaces_dict[ui_app.selected_namespace, ui_app.selected_cluster]
 
 
@@ -153,38 +245,249 @@ def generate_checksum(input_string: str) -> str:
     return hashlib.sha256(input_string.encode("utf-8")).hexdigest()
 
 
-def gql_query(query: str) -> dict[Any, Any]:
-    checksum = generate_checksum(query)
-    if checksum not in cache:
-        headers = {}
-        if token := get_var("APP_INT_TOKEN", hidden=True, default=""):
-            headers["Authorization"] = token
+def gql_checksum(query: str, variables: dict[str, Any] | None = None) -> str:
+    """Return the cache checksum of a query and its variables."""
+    if not variables:
+        return generate_checksum(query)
+    return generate_checksum(query + json.dumps(variables, sort_keys=True))
+
+
+def gql_meta_key(checksum: str) -> str:
+    return f"gql_meta:{checksum}"
+
+
+def gql_data_key(checksum: str) -> str:
+    return f"gql_data:{checksum}"
+
+
+def gql_operation(query: str) -> str:
+    return m.group(1) if (m := re.search(r"query\s+(\w+)", query)) else ""
+
+
+def gql_fetch(query: str, variables: dict[str, Any] | None = None) -> dict[Any, Any]:
+    """Query app-interface and cache the result."""
+    headers = {}
+    if token := get_var("APP_INT_TOKEN", hidden=True, default=""):
+        headers["Authorization"] = token
+    with tracing.span("gql.fetch", query=gql_operation(query)):
         res = requests.post(
             url=get_var("APP_INTERFACE_URL"),
-            json={"query": query},
+            json={"query": query, "variables": variables},
             headers=headers,
             timeout=10,
         )
         res.raise_for_status()
-        cache.set(
-            checksum,
-            res.json()["data"],
-            expire=get_var("CACHE_TIMEOUT_MINUTES", default=60) * 60,
-        )
-    return cache[checksum]
+        data = res.json()["data"]
+    checksum = gql_checksum(query, variables)
+    cache().set(gql_data_key(checksum), data, expire=gql_max_age())
+    cache().set(
+        gql_meta_key(checksum),
+        {"query": query, "variables": variables, "fetched_at": time.time()},
+        expire=gql_max_age(),
+    )
+    if query in {CLUSTERS_DEFINITION, NAMESPACES_DEFINITION}:
+        update_completion_index()
+    return data
+
+
+def gql_max_age() -> int:
+    """Maximum age of cached results in seconds."""
+    return int(get_var("CACHE_MAX_AGE_MINUTES", default=GQL_CACHE_MAX_AGE)) * 60
+
+
+def gql_is_stale(meta: dict[str, Any]) -> bool:
+    timeout = int(get_var("CACHE_TIMEOUT_MINUTES", default=GQL_CACHE_TIMEOUT)) * 60
+    return time.time() - meta["fetched_at"] > timeout
+
+
+def gql_cached(*definitions: str) -> str | None:
+    """Return "fresh" or "stale" if all query results are cached, else None."""
+    states = set()
+    for definition in definitions:
+        if not (meta := cache().get(gql_meta_key(gql_checksum(definition)))):
+            return None
+        states.add("stale" if gql_is_stale(meta) else "fresh")
+    return "stale" if "stale" in states else "fresh"
+
+
+def gql_refresh_in_background() -> None:
+    """Start a detached ocl process which refreshes the stale cache entries.
+
+    The detached process can't prompt for the App-Interface URL; without
+    OCL_APP_INTERFACE_URL(_COMMAND), this process refreshes them instead.
+    """
+    if not has_var("APP_INTERFACE_URL"):
+        # shell completion can't prompt either, the stale results will do
+        if not os.environ.get(completion.COMPLETE_VAR):
+            gql_refresh()
+        return
+    # single-flight across all ocl processes; the key expires to recover
+    # from a crashed refresh and is deleted when the refresh is done
+    if not cache().add(GQL_REFRESH_KEY, os.getpid(), expire=GQL_REFRESH_TIMEOUT):
+        return
+    subprocess.Popen(
+        [sys.executable, "-m", "openshift_cluster_login", "--refresh-cache"],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def gql_refresh() -> None:
+    """Refresh all stale cache entries."""
+    for key in list(cache().iterkeys()):
+        if not str(key).startswith("gql_meta:"):
+            continue
+        if (meta := cache().get(key)) and gql_is_stale(meta):
+            gql_fetch(meta["query"], meta.get("variables"))
+
+
+def gql_model_key(checksum: str) -> str:
+    return f"gql_model:{checksum}:{snapshot.schema_version()}"
+
+
+def gql_model(
+    definition: str,
+    query: Callable[..., T],
+    variables: dict[str, Any] | None = None,
+) -> T:
+    """Run a generated query function, reusing the validated result.
+
+    The validated result is cached as a snapshot (see snapshot.py) which loads
+    faster than the raw result plus its validation.
+    """
+    checksum = gql_checksum(definition, variables)
+    meta = cache().get(gql_meta_key(checksum))
+    cached = cache().get(gql_model_key(checksum)) if meta else None
+    if cached and cached["fetched_at"] == meta["fetched_at"]:
+        if gql_is_stale(meta):
+            gql_refresh_in_background()
+        with tracing.span("gql.snapshot", query=gql_operation(definition)):
+            return snapshot.loads(cached["snapshot"])
+
+    with tracing.span("gql.validate", query=gql_operation(definition)):
+        data = query(query_func=gql_query, variables=variables)
+    # gql_query() might have fetched a new result
+    if meta := cache().get(gql_meta_key(checksum)):
+        try:
+            cache().set(
+                gql_model_key(checksum),
+                {"fetched_at": meta["fetched_at"], "snapshot": snapshot.dumps(data)},
+                expire=gql_max_age(),
+            )
+        except snapshot.SnapshotError as e:
+            log.debug("Can't snapshot %s: %s", type(data).__name__, e)
+    return data
+
+
+def gql_query(query: str, variables: dict[str, Any] | None = None) -> dict[Any, Any]:
+    """Return the cached query result or query app-interface.
+
+    Results older than OCL_CACHE_TIMEOUT_MINUTES are still returned, but
+    refreshed in the background. Only results older than
+    OCL_CACHE_MAX_AGE_MINUTES are refreshed before returning.
+    """
+    with tracing.span("gql.query", query=gql_operation(query)) as attrs:
+        checksum = gql_checksum(query, variables)
+        meta = cache().get(gql_meta_key(checksum))
+        data = cache().get(gql_data_key(checksum)) if meta else None
+        if data is None:
+            attrs["cache"] = "miss"
+            return gql_fetch(query, variables)
+        attrs["cache"] = "stale" if gql_is_stale(meta) else "hit"
+        if attrs["cache"] == "stale":
+            gql_refresh_in_background()
+        return data
 
 
 def clusters_from_app_interface() -> list[Cluster]:
-    clusters = clusters_query(query_func=gql_query).clusters or []
+    clusters = gql_model(CLUSTERS_DEFINITION, clusters_query).clusters or []
     return [c for c in clusters if c.auth]
 
 
-def namespaces_from_app_interface() -> list[NamespaceV1]:
+def user_clusters() -> list[Cluster]:
+    return [Cluster(**c) for c in json.loads(get_var("USER_CLUSTERS", default="[]"))]
+
+
+def all_clusters() -> list[Cluster]:
+    """App-interface and user defined clusters; keeps the cluster index current."""
+    clusters = clusters_from_app_interface() + user_clusters()
+    update_cluster_index([c.model_dump(by_alias=True) for c in clusters])
+    return clusters
+
+
+def namespaces_from_app_interface() -> list[ClusterNamespace]:
+    # namespaces only reference their cluster by name; all namespaces of a
+    # cluster share the same Cluster instance
+    clusters = {
+        c.name: c for c in gql_model(CLUSTERS_DEFINITION, clusters_query).clusters or []
+    }
     return [
-        ns
-        for ns in namespaces_query(query_func=gql_query).namespaces or []
-        if not ns.delete
+        ClusterNamespace(name=ns.name, cluster=clusters[ns.cluster.name])
+        for ns in gql_model(NAMESPACES_DEFINITION, namespaces_query).namespaces or []
+        if not ns.delete and ns.cluster.name in clusters
+    ]
+
+
+def update_completion_index() -> None:
+    """Rewrite the completion index if the cached clusters or namespaces changed.
+
+    Works on the raw query results; validating them takes longer than writing
+    the index.
+    """
+    metas = [
+        cache().get(gql_meta_key(gql_checksum(definition)))
+        for definition in (CLUSTERS_DEFINITION, NAMESPACES_DEFINITION)
     ]
+    if not all(metas):
+        return
+    stamp = " ".join([
+        *(str(meta["fetched_at"]) for meta in metas),
+        generate_checksum(user_clusters_source()),
+    ])
+    if completion.index_stamp(completion_index_file()) == stamp:
+        return
+    clusters = cache().get(gql_data_key(gql_checksum(CLUSTERS_DEFINITION)))
+    namespaces = cache().get(gql_data_key(gql_checksum(NAMESPACES_DEFINITION)))
+    if clusters is None or namespaces is None:
+        return
+    cluster_names = {c["name"] for c in clusters["clusters"] or []}
+    completion.write_index(
+        stamp,
+        clusters=[c["name"] for c in clusters["clusters"] or [] if c.get("auth")]
+        + [c.name for c in user_clusters()],
+        namespaces=[
+            (ns["cluster"]["name"], ns["name"])
+            for ns in namespaces["namespaces"] or []
+            if not ns.get("delete") and ns["cluster"]["name"] in cluster_names
+        ],
+    )
+
+
+def cluster_namespaces(cluster_name: str) -> list[str]:
+    """Return the namespace names of a cluster; cached per cluster."""
+    data = gql_model(
+        NAMESPACES_BY_CLUSTER_DEFINITION,
+        namespaces_by_cluster_query,
+        variables={"filter": {"cluster": {"filter": {"name": cluster_name}}}},
+    )
+    return [ns.name for ns in data.namespaces or [] if not ns.delete]
+
+
+def refreshed_namespaces(*, release: bool = False) -> list[ClusterNamespace]:
+    """Fetch the missing or stale query results and return the namespaces.
+
+    With release, GQL_REFRESH_KEY (taken by the caller) is deleted afterwards.
+    """
+    try:
+        for definition in (CLUSTERS_DEFINITION, NAMESPACES_DEFINITION):
+            if gql_cached(definition) != "fresh":
+                gql_fetch(definition)
+    finally:
+        if release:
+            cache().delete(GQL_REFRESH_KEY)
+    return namespaces_from_app_interface()
 
 
 def cluster_oauth(console_url: str, *, hypershift: bool) -> str:
@@ -209,28 +512,111 @@ def token_display_url(console_url: str, *, hypershift: bool) -> str:
     return f"https://{url}/oauth/token/display"
 
 
+def probe_idp(console_url: str, idp: str) -> bool:
+    with tracing.span("idp.probe", idp=idp) as attrs:
+        try:
+            requests.get(
+                token_request_url(console_url, idp, hypershift=False),
+                allow_redirects=False,
+                timeout=10,
+            ).raise_for_status()
+        except requests.exceptions.RequestException as e:
+            attrs["failed"] = type(e).__name__
+            return False
+        return True
+
+
 def select_idp(console_url: str, idps: list[str]) -> str | None:
-    for idp in idps:
-        req = requests.get(
-            token_request_url(console_url, idp, hypershift=False),
-            allow_redirects=False,
-            timeout=10,
-        )
+    """Probe all IdPs at once and return the first working one in given order.
+
+    The probes run in daemon threads: once a better IdP answered, neither this
+    call nor the exit of ocl waits for the others (a ThreadPoolExecutor's
+    threads are joined at exit).
+    """
+
+    def probe(idp: str, result: Future[bool]) -> None:
         try:
-            req.raise_for_status()
+            result.set_result(probe_idp(console_url, idp))
+        except BaseException as e:  # noqa: BLE001
+            result.set_exception(e)
+
+    probes: list[Future[bool]] = [Future() for _ in idps]
+    for idp, result in zip(idps, probes, strict=True):
+        threading.Thread(
+            target=probe, args=(idp, result), name=f"probe {idp}", daemon=True
+        ).start()
+    for idp, result in zip(idps, probes, strict=True):
+        if result.result():
             return idp
-        except requests.exceptions.HTTPError:
-            pass
     return None
 
 
-def kubeconfig(cluster: Cluster, *, temp_kube_config: bool) -> str:
-    kc = f"{Path.home()}/.kube/config_{cluster.name}"
-    if temp_kube_config:
-        _, temp_file = tempfile.mkstemp(prefix=f"ocl.{cluster.name}.")
-        shutil.copyfile(kc, temp_file)
-        return temp_file
-    return kc
+def idp_key(cluster_name: str) -> str:
+    return f"idp:{cluster_name}"
+
+
+def cluster_idp(cluster: Cluster, idps: list[str]) -> str | None:
+    """Return the IdP to log in with, probing only if none was learned yet."""
+    # the learned IdP is stored with all IdPs preferred over it; it's only
+    # valid as long as they are still preferred in the same order
+    learned = cache().get(idp_key(cluster.name))
+    if learned and idps[: len(learned)] == learned:
+        return learned[-1]
+    with tracing.span("idp.select", cluster=cluster.name):
+        idp = select_idp(cluster.console_url, idps=idps)
+    if idp:
+        cache().set(
+            idp_key(cluster.name),
+            idps[: idps.index(idp) + 1],
+            expire=IDP_CACHE_TIMEOUT,
+        )
+    return idp
+
+
+def kubeconfig(cluster: Cluster) -> Path:
+    return Path.home() / ".kube" / f"config_{cluster.name}"
+
+
+@contextmanager
+def session_env(
+    cluster: Cluster | None,
+    *,
+    temp_kube_config: bool,
+    project: str = "",
+    token: str | None = None,
+) -> Generator[dict[str, str], None, None]:
+    """Yield the environment of a child process for the cluster.
+
+    With temp_kube_config, the child gets its own minimal kubeconfig (see
+    kube_config.session_kubeconfig()), so its ``oc project`` calls don't
+    affect other sessions. With a token, that kubeconfig uses the token
+    instead of the cluster kubeconfig, which isn't touched at all.
+    """
+    env = copy.deepcopy(dict(os.environ))
+    if not cluster:
+        yield env
+        return
+    env["OCL_CLUSTER_NAME"] = cluster.name
+    env["OCL_CLUSTER_CONSOLE"] = cluster.console_url
+    if not temp_kube_config and not token:
+        env["KUBECONFIG"] = str(kubeconfig(cluster))
+        yield env
+        return
+    from openshift_cluster_login.kube_config import (
+        EXEC_USER,
+        KubeConfig,
+        session_kubeconfig,
+    )
+
+    if token:
+        config = KubeConfig(kubeconfig(cluster), {})
+        user = token_user(cluster.name) or EXEC_USER
+        config.set_login(cluster.server_url, user, token, project or "default")
+    else:
+        config = KubeConfig.load(kubeconfig(cluster))
+    with session_kubeconfig(config.session(project), cluster.name) as path:
+        env["KUBECONFIG"] = str(path)
+        yield env
 
 
 def run(
@@ -241,91 +627,412 @@ def run(
     capture_output: bool = True,
     cluster: Cluster | None = None,
     temp_kube_config: bool = False,
+    project: str = "",
 ) -> subprocess.CompletedProcess:
-    env = copy.deepcopy(os.environ)
-    if cluster:
-        env["KUBECONFIG"] = kubeconfig(cluster, temp_kube_config=temp_kube_config)
-        env["OCL_CLUSTER_NAME"] = cluster.name
-        env["OCL_CLUSTER_CONSOLE"] = cluster.console_url
-    return subprocess.run(
-        cmd, shell=shell, check=check, env=env, capture_output=capture_output
-    )
+    attributes = {}
+    if tracing.enabled():
+        # the arguments might contain a token; a shell command might not split
+        program = cmd.split(maxsplit=1)[:1] if isinstance(cmd, str) else cmd[:2]
+        attributes["command"] = " ".join(program)
+    with (
+        session_env(cluster, temp_kube_config=temp_kube_config, project=project) as env,
+        tracing.span("run", **attributes),
+    ):
+        return subprocess.run(
+            cmd, shell=shell, check=check, env=env, capture_output=capture_output
+        )
 
 
-def oc_login(cluster: Cluster, token: str) -> None:
-    run(
-        ["oc", "login", f"--token={token}", f"--server={cluster.server_url}"],
-        cluster=cluster,
+def kube_login(cluster: Cluster, token: str, project: str = "") -> bool:
+    """Log in like ``oc login`` and ``oc project``, with one kubeconfig write.
+
+    Returns False if the project can't be entered; the previous namespace is
+    kept then.
+    """
+    from openshift_cluster_login.kube_api import project_access, whoami
+    from openshift_cluster_login.kube_config import KubeConfig
+
+    with tracing.span("login.kubeconfig", cluster=cluster.name):
+        user = (
+            token_user(cluster.name)
+            if token == cache().get(token_key(cluster.name))
+            else None
+        ) or whoami(cluster.server_url, token)
+        if not user:
+            msg = f"the API server {cluster.server_url} rejected the token"
+            raise LoginError(msg)
+        entered = not project or project_access(cluster.server_url, token, project)
+        config = KubeConfig.load(kubeconfig(cluster))
+        namespace = project if project and entered else config.namespace()
+        config.set_login(cluster.server_url, user, token, namespace or "default")
+        config.save()
+    remember_login(cluster.name, token)
+    return entered
+
+
+def kube_project(cluster: Cluster, project: str) -> bool:
+    """Enter the project like ``oc project``; False if that's not possible."""
+    from openshift_cluster_login.kube_api import project_access
+    from openshift_cluster_login.kube_config import KubeConfig
+
+    if not (token := kubeconfig_token(cluster)) or not project_access(
+        cluster.server_url, token, project
+    ):
+        return False
+    config = KubeConfig.load(kubeconfig(cluster))
+    if not config.set_namespace(project):
+        return False
+    config.save()
+    return True
+
+
+def login_key(cluster_name: str) -> str:
+    return f"login_validated:{cluster_name}"
+
+
+def remember_login(cluster_name: str, token: str) -> None:
+    """Remember that the kubeconfig token of the cluster is valid, for a while."""
+    cache().set(
+        login_key(cluster_name), generate_checksum(token), expire=TOKEN_VALIDATION_TTL
     )
 
 
-def oc_project(cluster: Cluster, project: str) -> None:
-    run(["oc", "project", project], cluster=cluster)
+def kubeconfig_token(cluster: Cluster) -> str | None:
+    """Return the token of the cluster kubeconfig if it's for the cluster."""
+    from openshift_cluster_login.kube_config import KubeConfig
+
+    config = KubeConfig.load(kubeconfig(cluster))
+    if not config.config.get("current-context"):
+        return None
+    session = config.session()
+    if not session["clusters"] or not session["users"]:
+        return None
+    server = (session["clusters"][0].get("cluster") or {}).get("server") or ""
+    # oc login stores the URL with an explicit port
+    if normalize_server_url(server) != normalize_server_url(cluster.server_url):
+        return None
+    return (session["users"][0].get("user") or {}).get("token")
+
+
+def check_login(cluster: Cluster) -> bool:
+    """Return True if the cluster kubeconfig holds a valid token.
+
+    Like ``oc cluster-info``, but in-process: the token is validated against
+    the API server only if it wasn't within the last TOKEN_VALIDATION_TTL
+    seconds.
+    """
+    from openshift_cluster_login.kube_api import whoami
+
+    with tracing.span("login.check", cluster=cluster.name) as attrs:
+        attrs["cache"] = "hit"
+        if not (token := kubeconfig_token(cluster)):
+            valid = False
+        elif cache().get(login_key(cluster.name)) == generate_checksum(token) or (
+            token == cache().get(token_key(cluster.name)) and token_user(cluster.name)
+        ):
+            valid = True
+        else:
+            attrs["cache"] = "miss"
+            if valid := bool(whoami(cluster.server_url, token)):
+                remember_login(cluster.name, token)
+        attrs["valid"] = valid
+    return valid
 
 
-def oc_check_login(cluster: Cluster) -> bool:
-    try:
-        run(["oc", "cluster-info"], cluster=cluster)
-        return True
-    except subprocess.CalledProcessError:
-        return False
+_kerberos = threading.local()
 
 
-def validate_token(cluster: Cluster, token: str) -> bool:
-    try:
-        subprocess.run(
-            ["oc", "whoami", f"--token={token}", f"--server={cluster.server_url}"],
-            check=True,
-            capture_output=True,
-        )
-        return True
-    except subprocess.CalledProcessError:
-        return False
+def kerberos_session() -> requests.Session:
+    """Return the Kerberos session of the current thread.
+
+    Reusing the session keeps SSO cookies and connections across logins.
+    """
+    from requests_gssapi import HTTPKerberosAuth
 
+    if (session := getattr(_kerberos, "session", None)) is None:
+        session = _kerberos.session = requests.Session()
+        session.auth = HTTPKerberosAuth()
+    return session
+
+
+def fetch_token(cluster: Cluster, idps: list[str], *, interactive: bool = True) -> str:
+    from pyquery import PyQuery as pq  # noqa: N813
 
-def fetch_token(cluster: Cluster, idps: list[str]) -> str:
     hypershift = bool(cluster.spec.hypershift) if cluster.spec else False
-    idp = select_idp(cluster.console_url, idps=idps) if not hypershift else None
+    idp = cluster_idp(cluster, idps=idps) if not hypershift else None
     if idp or hypershift:
-        with requests.Session() as session:
-            session.auth = HTTPKerberosAuth()
-            r = session.get(
-                token_request_url(cluster.console_url, idp, hypershift=hypershift)
-            )
-            r.raise_for_status()
+        session = kerberos_session()
+        with tracing.span("login.kerberos", cluster=cluster.name, idp=idp):
+            try:
+                r = session.get(
+                    token_request_url(cluster.console_url, idp, hypershift=hypershift),
+                    timeout=LOGIN_TIMEOUT,
+                )
+                r.raise_for_status()
+            except requests.exceptions.RequestException:
+                # probe again next time
+                cache().delete(idp_key(cluster.name))
+                raise
             form_data = pq(r.text)("form").serialize_dict()
             r = session.post(
                 token_display_url(cluster.console_url, hypershift=hypershift),
                 data=form_data,
+                timeout=LOGIN_TIMEOUT,
             )
             r.raise_for_status()
             return pq(r.text)("code")[0].text
-    else:
+    if not interactive:
+        raise InteractiveLoginRequiredError(f"no working IdP for {cluster.name}")
+    with tracing.span("login.manual", cluster=cluster.name):
         webbrowser.open(cluster.console_url)
         return Prompt.ask("Enter token", password=True)
 
 
-def oc_setup(cluster: Cluster, idps: list[str], *, refresh_login: bool) -> None:
+def _valid_cached_token(cluster: Cluster) -> str | None:
+    token = cache().get(token_key(cluster.name))
+    if not token or (
+        not token_user(cluster.name)
+        and not validate_token(cluster.name, cluster.server_url, token)
+    ):
+        return None
+    return token
+
+
+# cluster locks held by any thread; see _release_locks()
+_held_locks: set[Lock] = set()
+
+
+@atexit.register
+def _release_locks() -> None:
+    """Release the locks of daemon threads, e.g. of an unfinished warm-up login.
+
+    Otherwise the next login to the cluster would wait for the lock to expire.
+    """
+    for lock in list(_held_locks):
+        with suppress(Exception):
+            lock.unlock(unconditionally=True)
+
+
+@contextmanager
+def locked(cluster: Cluster) -> Generator[None, None, None]:
+    """Hold the login lock of the cluster, see storage.cluster_lock()."""
+    lock = cluster_lock(cluster.name)
+    with tracing.span("lock.wait", cluster=cluster.name):
+        try:
+            lock.lock()
+        except TimeOutError:
+            msg = (
+                f"Timed out waiting for another login to {cluster.name}; "
+                f"remove {lock.lockfile} if no ocl is running"
+            )
+            raise LoginError(msg) from None
+    _held_locks.add(lock)
+    try:
+        yield
+    finally:
+        _held_locks.discard(lock)
+        lock.unlock()
+
+
+def get_cluster_token(
+    cluster: Cluster, idps: list[str], *, interactive: bool = True
+) -> str:
+    """Return a valid token for the cluster, fetching a new one if needed.
+
+    Concurrent callers for the same cluster fetch only once: the first one
+    logs in, the others wait for the lock and use the freshly cached token.
+    """
+    with tracing.span("token", cluster=cluster.name) as attrs:
+        attrs["cache"] = "hit"
+        seen = cache().get(token_key(cluster.name))
+        if token := _valid_cached_token(cluster):
+            return token
+        with locked(cluster):
+            # a token cached meanwhile was fetched and validated by the lock
+            # holder; the one seen before was validated above already
+            token = cache().get(token_key(cluster.name))
+            if token and token != seen:
+                return token
+            attrs["cache"] = "miss"
+            return new_token(cluster, idps=idps, interactive=interactive)
+
+
+def new_token(cluster: Cluster, idps: list[str], *, interactive: bool = True) -> str:
+    """Fetch and cache a new token, the cluster lock must be held."""
+    token = fetch_token(cluster, idps=idps, interactive=interactive)
+    cache().set(token_key(cluster.name), token)
+    validate_token(cluster.name, cluster.server_url, token)
+    return token
+
+
+def warm_up_login(cluster: Cluster, idps: list[str]) -> None:
+    """Get a token for the cluster unless logged in already, never prompting.
+
+    Errors are ignored; the regular login reports them if the cluster is
+    selected.
+    """
+    with (
+        tracing.span("login.warm_up", cluster=cluster.name),
+        suppress(Exception),
+    ):
+        if not check_login(cluster):
+            get_cluster_token(cluster, idps=idps, interactive=False)
+
+
+def oc_setup(
+    cluster: Cluster, idps: list[str], *, refresh_login: bool, project: str = ""
+) -> bool:
+    """Log in to the cluster unless logged in already and enter the project.
+
+    Returns False if the project can't be entered.
+    """
+    from rich.progress import Progress, SpinnerColumn, TextColumn
+
     with Progress(
         SpinnerColumn(), TextColumn("[progress.description]{task.description}")
     ) as progress:
         task = progress.add_task(description="Acquiring lock ...", total=1)
-        with lock:
+        with locked(cluster):
             progress.remove_task(task)
 
             if not refresh_login:
                 task = progress.add_task(
                     description="Testing already logged in ..", total=1
                 )
-                logged_in = oc_check_login(cluster)
+                logged_in = check_login(cluster)
                 progress.remove_task(task)
 
             if not refresh_login and logged_in:
-                return
+                return not project or kube_project(cluster, project)
 
             task = progress.add_task(description="CLI login ...", total=1)
-            oc_login(cluster=cluster, token=fetch_token(cluster, idps=idps))
+            # e.g. fetched by warm_up_login() while the namespace was picked
+            token = None if refresh_login else _valid_cached_token(cluster)
+            entered = kube_login(
+                cluster, token or new_token(cluster, idps=idps), project
+            )
             progress.remove_task(task)
+            return entered
+
+
+def resolve_clusters(names: list[str]) -> list[Cluster]:
+    """Resolve cluster names, globs, @starred and @kubeconfig to clusters."""
+    clusters = {c.name: c for c in all_clusters()}
+    wanted: dict[str, None] = {}
+    for name in names:
+        if name == "@starred":
+            wanted.update(dict.fromkeys(Favorites.load().starred_clusters()))
+        elif name == "@kubeconfig":
+            from openshift_cluster_login.kube_config import KubeConfig
+
+            contexts = KubeConfig.load().exec_contexts()
+            wanted.update(dict.fromkeys(sorted(contexts.values())))
+        elif any(c in name for c in "*?["):
+            if not (matches := fnmatch.filter(clusters, name)):
+                rich_print(f"[yellow]skipping {name}, no cluster matches[/]")
+            wanted.update(dict.fromkeys(sorted(matches)))
+        else:
+            wanted[name] = None
+    for name in wanted:
+        if name not in clusters:
+            rich_print(f"[yellow]skipping {name}, unknown cluster[/]")
+    return [clusters[name] for name in wanted if name in clusters]
+
+
+def prefetch_tokens(clusters: list[Cluster], idps: list[str], jobs: int) -> bool:
+    """Log in to the clusters concurrently and report the results."""
+    from rich.progress import Progress
+    from rich.table import Table
+
+    def prefetch(cluster: Cluster) -> tuple[str, float]:
+        start = time.monotonic()
+        if _valid_cached_token(cluster):
+            status = "[green]cached[/]"
+        else:
+            get_cluster_token(cluster, idps=idps, interactive=False)
+            status = "[green]logged in[/]"
+        return status, time.monotonic() - start
+
+    results: dict[str, tuple[str, float | None]] = {}
+    with (
+        Progress(transient=True) as progress,
+        ThreadPoolExecutor(max_workers=jobs) as executor,
+    ):
+        task = progress.add_task("Logging in ...", total=len(clusters))
+        futures = {executor.submit(prefetch, c): c.name for c in clusters}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:  # noqa: BLE001
+                results[futures[future]] = (f"[bold red]failed[/] {e}", None)
+            progress.advance(task)
+
+    table = Table("Cluster", "Result", "Time")
+    for name, (status, duration) in sorted(results.items()):
+        table.add_row(name, status, f"{duration:.1f}s" if duration is not None else "")
+    rich_print(table)
+    return all(duration is not None for _, duration in results.values())
+
+
+def exec_clusters(
+    clusters: list[Cluster], command: str, idps: list[str], jobs: int
+) -> int:
+    """Run the command on the clusters concurrently and report the results.
+
+    Output lines are prefixed with the cluster name and written as they come.
+    Returns the highest exit code, 1 if a login failed.
+    """
+    from rich.console import Console
+    from rich.table import Table
+
+    width = max((len(c.name) for c in clusters), default=0)
+    output = threading.Lock()
+
+    def execute(cluster: Cluster) -> tuple[int, float]:
+        start = time.monotonic()
+        token = get_cluster_token(cluster, idps=idps, interactive=False)
+        with (
+            session_env(cluster, temp_kube_config=True, token=token) as env,
+            tracing.span("exec", cluster=cluster.name),
+            subprocess.Popen(
+                shlex.split(command),
+                env=env,
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            ) as process,
+        ):
+            for line in process.stdout or ():
+                text = line.decode("utf-8", errors="replace").rstrip("\r\n")
+                with output:
+                    sys.stdout.write(f"{cluster.name:<{width}} | {text}\n")
+                    sys.stdout.flush()
+        duration = time.monotonic() - start
+        # killed by a signal: report it like a shell does
+        if process.returncode < 0:
+            return 128 - process.returncode, duration
+        return process.returncode, duration
+
+    results: dict[str, tuple[str, int, float | None]] = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(execute, c): c.name for c in clusters}
+        for future in as_completed(futures):
+            try:
+                returncode, duration = future.result()
+            except Exception as e:  # noqa: BLE001
+                results[futures[future]] = (f"[bold red]failed[/] {e}", 1, None)
+                continue
+            status = (
+                f"[bold red]exit code {returncode}[/]" if returncode else "[green]ok[/]"
+            )
+            results[futures[future]] = (status, returncode, duration)
+
+    table = Table("Cluster", "Result", "Time")
+    for name, (status, _, elapsed) in sorted(results.items()):
+        table.add_row(name, status, f"{elapsed:.1f}s" if elapsed is not None else "")
+    # stdout is for the command output
+    Console(stderr=True).print(table)
+    return max((returncode for _, returncode, _ in results.values()), default=0)
 
 
 def blend_text(
@@ -364,20 +1071,23 @@ def enable_requests_logging() -> None:
 
 
 def complete_cluster(ctx: typer.Context, incomplete: str) -> Generator[str, None, None]:
-    for cluster in clusters_from_app_interface():
-        if cluster.name.startswith(incomplete):
-            yield cluster.name
+    # the next completion won't need typer anymore
+    update_completion_index()
+    names = indexed_cluster_names()
+    if names is None:
+        names = [c.name for c in clusters_from_app_interface()]
+    for name in names:
+        if name.startswith(incomplete):
+            yield name
 
 
 def complete_project(ctx: typer.Context, incomplete: str) -> Generator[str, None, None]:
     cluster = ctx.params.get("cluster_name")
     if not cluster:
         return
-    for ns in [
-        ns for ns in namespaces_from_app_interface() if ns.cluster.name == cluster
-    ]:
-        if ns.name.startswith(incomplete):
-            yield ns.name
+    for name in cluster_namespaces(cluster):
+        if name.startswith(incomplete):
+            yield name
 
 
 def print(msg: str | Text, *, quiet: bool) -> None:  # noqa: A001
@@ -387,49 +1097,40 @@ def print(msg: str | Text, *, quiet: bool) -> None:  # noqa: A001
 
 
 def _find_cluster_by_server(server_url: str) -> Cluster | None:
-    clusters = clusters_from_app_interface()
-    clusters += [Cluster(**c) for c in json.loads(get_var("USER_CLUSTERS", default="[]"))]
-    return next((c for c in clusters if c.server_url == server_url), None)
-
-
-def _cluster_in_kubeconfig(cluster_name: str) -> bool:
-    result = subprocess.run(
-        ["kubectl", "config", "get-clusters"],
-        capture_output=True,
-        text=True,
+    if cluster := lookup_server(server_url):
+        return Cluster(**cluster)
+    if is_unknown_server(server_url):
+        return None
+    server = normalize_server_url(server_url)
+    found = next(
+        (c for c in all_clusters() if normalize_server_url(c.server_url) == server),
+        None,
     )
-    if result.returncode != 0:
-        return False
-    return cluster_name in result.stdout.strip().splitlines()[1:]
+    if found is None:
+        remember_unknown_server(server_url)
+    return found
 
 
-def _write_exec_credential_entry(cluster: Cluster) -> None:
-    subprocess.run(
-        ["kubectl", "config", "set-cluster", cluster.name, f"--server={cluster.server_url}"],
-        check=True,
-        capture_output=True,
-    )
-    subprocess.run(
-        [
-            "kubectl", "config", "set-credentials", "ocl",
-            "--exec-api-version=client.authentication.k8s.io/v1beta1",
-            "--exec-command=ocl",
-            "--exec-arg=--get-token",
-            "--exec-interactive-mode=IfAvailable",
-            "--exec-provide-cluster-info=true",
-        ],
-        check=True,
-        capture_output=True,
-    )
-    subprocess.run(
-        [
-            "kubectl", "config", "set-context", cluster.name,
-            f"--cluster={cluster.name}",
-            "--user=ocl",
-        ],
-        check=True,
-        capture_output=True,
-    )
+def import_exec_clusters(
+    clusters: list[Cluster], *, overwrite: bool, prune: bool, verb: str
+) -> None:
+    """Add exec credential plugin entries to the kubeconfig in one write."""
+    from openshift_cluster_login.kube_config import EXEC_USER, KubeConfig
+
+    config = KubeConfig.load()
+    existing = config.names("clusters")
+    config.set_exec_user()
+    for cluster in clusters:
+        if not overwrite and cluster.name in existing:
+            rich_print(f"[yellow]skipping {cluster.name}, already exists[/]")
+            continue
+        config.set_cluster(cluster.name, cluster.server_url)
+        config.set_context(cluster.name, cluster=cluster.name, user=EXEC_USER)
+        rich_print(f"{verb} [bold green]{cluster.name}[/] ({cluster.server_url})")
+    if prune:
+        for name in config.prune_exec_contexts(keep={c.name for c in clusters}):
+            rich_print(f"[red]removed {name}[/]")
+    config.save()
 
 
 @app.command(epilog="Made with :heart: by [blue]https://github.com/chassing[/]")
@@ -487,59 +1188,122 @@ def main(  # noqa: C901
         is_flag=True,
         help="Overwrite existing kubeconfig entries (used with --import-cluster/--import-clusters).",
     ),
+    prune: bool = typer.Option(
+        default=False,
+        is_flag=True,
+        help="Remove ocl kubeconfig entries of clusters that no longer exist (used with --import-clusters).",
+    ),
+    prefetch: list[str] = typer.Option(  # noqa: B008
+        default=[],
+        metavar="CLUSTER",
+        help="Log in to these clusters ahead of time and cache their tokens. Use '@starred' for the clusters of starred namespaces and '@kubeconfig' for all imported clusters.",
+    ),
+    exec_on: list[str] = typer.Option(  # noqa: B008
+        [],
+        "--exec",
+        metavar="CLUSTER|GLOB",
+        help="Run --command on these clusters concurrently and prefix its output with the cluster name. Accepts the same values as --prefetch and globs, e.g. 'prod-*'.",
+    ),
+    jobs: int = typer.Option(
+        default=PREFETCH_JOBS,
+        min=1,
+        help="Number of concurrent logins or commands (used with --prefetch and --exec).",
+    ),
+    trace_file: Path | None = typer.Option(  # noqa: B008
+        None,
+        "--trace",
+        envvar="OCL_TRACE",
+        metavar="FILE",
+        help="Append timing traces to FILE (Chrome trace event format for *.json, JSON lines otherwise).",
+    ),
+    refresh_cache: bool = typer.Option(
+        default=False,
+        is_flag=True,
+        hidden=True,
+        help="Refresh stale app-interface cache entries (used internally).",
+    ),
+    agent: bool = typer.Option(
+        default=False,
+        is_flag=True,
+        help="Run the token agent that answers --get-token requests over a Unix socket (OCL_AGENT_SOCK).",
+    ),
 ) -> None:
+    if trace_file:
+        tracing.start(trace_file)
+
+    if refresh_cache:
+        try:
+            gql_refresh()
+        finally:
+            # started by gql_refresh_in_background(), which took the key
+            cache().delete(GQL_REFRESH_KEY)
+        return
+
+    if agent:
+        from openshift_cluster_login import agent as token_agent
+
+        socket_path = agent_socket()
+        if token_agent.agent_running(socket_path):
+            rich_print(f"[bold red]Agent already running on {socket_path}[/]")
+            sys.exit(1)
+        print(f"Token agent listening on {socket_path}", quiet=quiet)
+        token_agent.serve(socket_path)
+        return
+
     if get_token:
         if cluster_name:
             cluster = select_cluster(cluster_name)
         else:
-            exec_info_raw = os.environ.get("KUBERNETES_EXEC_INFO")
-            if not exec_info_raw:
-                typer.echo("KUBERNETES_EXEC_INFO not set — pass cluster_name or invoke via kubectl", err=True)
+            server_url = exec_info_server()
+            if not server_url:
+                typer.echo(
+                    "KUBERNETES_EXEC_INFO not set — pass cluster_name or invoke via kubectl",
+                    err=True,
+                )
                 raise typer.Exit(1)
-            server_url = json.loads(exec_info_raw)["spec"]["cluster"]["server"]
-            cluster = _find_cluster_by_server(server_url)
-            if cluster is None:
+            found_cluster = _find_cluster_by_server(server_url)
+            if found_cluster is None:
                 typer.echo(f"No OCL cluster found for server {server_url}", err=True)
                 raise typer.Exit(1)
-        cache_key = f"token:{cluster.name}"
-        validated_key = f"token_validated:{cluster.name}"
-        token = cache.get(cache_key)
-        recently_validated = cache.get(validated_key)
-        if not token or (not recently_validated and not validate_token(cluster, token)):
-            token = fetch_token(cluster, idps=idp)
-            cache.set(cache_key, token)
-        cache.set(validated_key, True, expire=TOKEN_VALIDATION_TTL)
-        expiry = datetime.now(tz=UTC) + timedelta(seconds=EXEC_CREDENTIAL_TTL)
-        builtins.print(json.dumps({
-            "apiVersion": "client.authentication.k8s.io/v1beta1",
-            "kind": "ExecCredential",
-            "status": {
-                "token": token,
-                "expirationTimestamp": expiry.strftime("%Y-%m-%dT%H:%M:%SZ"),
-            },
-        }))
+            cluster = found_cluster
+        try:
+            token = get_cluster_token(cluster, idps=idp)
+        except LoginError as e:
+            typer.echo(str(e), err=True)
+            raise typer.Exit(1) from None
+        builtins.print(exec_credential(token))
         return
 
     if import_cluster is not None:
-        cluster = select_cluster(import_cluster)
-        if not overwrite and _cluster_in_kubeconfig(cluster.name):
-            rich_print(f"[yellow]skipping {cluster.name}, already exists[/]")
-            return
-        _write_exec_credential_entry(cluster)
-        rich_print(f"imported [bold green]{cluster.name}[/] ({cluster.server_url})")
+        import_exec_clusters(
+            [select_cluster(import_cluster)],
+            overwrite=overwrite,
+            prune=False,
+            verb="imported",
+        )
         return
 
     if import_clusters:
-        clusters = clusters_from_app_interface()
-        clusters += [Cluster(**c) for c in json.loads(get_var("USER_CLUSTERS", default="[]"))]
-        for cluster in sorted(clusters, key=lambda c: c.name):
-            if not overwrite and _cluster_in_kubeconfig(cluster.name):
-                rich_print(f"[yellow]skipping {cluster.name}, already exists[/]")
-                continue
-            _write_exec_credential_entry(cluster)
-            rich_print(f"added [bold green]{cluster.name}[/] ({cluster.server_url})")
+        import_exec_clusters(
+            sorted(all_clusters(), key=lambda c: c.name),
+            overwrite=overwrite,
+            prune=prune,
+            verb="added",
+        )
+        return
+
+    if prefetch:
+        if not prefetch_tokens(resolve_clusters(prefetch), idps=idp, jobs=jobs):
+            sys.exit(1)
         return
 
+    if exec_on:
+        if command == os.environ["SHELL"]:
+            rich_print("[bold red]--exec needs a --command[/]")
+            sys.exit(1)
+        clusters = resolve_clusters(exec_on)
+        sys.exit(exec_clusters(clusters, command, idps=idp, jobs=jobs))
+
     logging.basicConfig(
         level=logging.INFO if not debug else logging.DEBUG, format="%(message)s"
     )
@@ -563,7 +1327,11 @@ def main(  # noqa: C901
     if cluster_name:
         cluster = select_cluster(cluster_name)
     else:
-        ns = select_namespace(history_enabled=history)
+        ns = select_namespace(
+            history_enabled=history,
+            # a login is needed afterwards; --refresh-login wants a new token
+            idps=None if open_in_browser or refresh_login else idp,
+        )
         cluster = ns.cluster
         project = ns.name
     console_url = cluster.console_url
@@ -577,24 +1345,22 @@ def main(  # noqa: C901
         bye(quiet=quiet)
         sys.exit(0)
     try:
-        oc_setup(
+        entered = oc_setup(
             cluster,
             idps=idp,
             refresh_login=refresh_login,
+            project=project,
         )
-    except subprocess.CalledProcessError as e:
-        print(f"[bold red]'oc login' failed![/]\nException: {e}", quiet=quiet)
+    except LoginError as e:
+        print(f"[bold red]Login failed![/]\nException: {e}", quiet=quiet)
         sys.exit(1)
 
-    if project:
-        try:
-            oc_project(cluster=cluster, project=project)
-        except subprocess.CalledProcessError:
-            print(
-                f"[bold red]Entering {project} failed! Maybe this project doesn't exist or you don't have proper permissions.[/]",
-                quiet=quiet,
-            )
-            project = ""
+    if not entered:
+        print(
+            f"[bold red]Entering {project} failed! Maybe this project doesn't exist or you don't have proper permissions.[/]",
+            quiet=quiet,
+        )
+        project = ""
 
     if command == os.environ["SHELL"]:
         print("Spawn new shell, use exit or CTRL+d to leave it!", quiet=quiet)
@@ -612,6 +1378,7 @@ def main(  # noqa: C901
         cluster=cluster,
         capture_output=False,
         temp_kube_config=True,
+        project=project,
     )
     if result.returncode != 0:
         print(
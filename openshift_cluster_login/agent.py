@@ -0,0 +1,141 @@
+"""ssh-agent style token agent.
+
+``ocl --agent`` keeps tokens, validation timestamps and the cluster index in
+memory and answers ``ocl --get-token`` requests over a Unix socket. The agent
+never logs in itself: without a valid token it answers with ``null`` and the
+client falls back to the regular ``--get-token`` code path, which stores the
+new token in the shared cache where the agent picks it up.
+
+Protocol: one JSON line per connection in each direction.
+
+    -> {"cluster": "<name or null>", "server": "<API server URL or null>"}
+    <- {"token": "<token or null>"}
+"""
+
+import json
+import logging
+import signal
+import socket
+import socketserver
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from openshift_cluster_login.cluster_index import (
+    CLUSTER_INDEX_KEY,
+    normalize_server_url,
+)
+from openshift_cluster_login.exec_credential import (
+    TOKEN_VALIDATION_TTL,
+    token_key,
+    validated_key,
+)
+from openshift_cluster_login.kube_api import whoami
+from openshift_cluster_login.storage import cache
+
+log = logging.getLogger(__name__)
+
+
+class TokenStore:
+    """In-memory tokens, validation timestamps and cluster index."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # cluster name -> (token, monotonic time of the last validation)
+        self._tokens: dict[str, tuple[str, float]] = {}
+        self._servers: dict[str, dict[str, Any]] = {}
+        self._clusters: dict[str, dict[str, Any]] = {}
+
+    def _load_index(self) -> None:
+        index = cache().get(CLUSTER_INDEX_KEY)
+        self._servers = index["servers"] if index else {}
+        self._clusters = {c["name"]: c for c in self._servers.values()}
+
+    def cluster(
+        self, cluster_name: str | None, server_url: str | None
+    ) -> dict[str, Any] | None:
+        with self._lock:
+            # reload the index once on a miss, the CLI might have rebuilt it
+            for _ in range(2):
+                if cluster_name and cluster_name in self._clusters:
+                    return self._clusters[cluster_name]
+                if server_url and (
+                    cluster := self._servers.get(normalize_server_url(server_url))
+                ):
+                    return cluster
+                self._load_index()
+        return None
+
+    def token(self, cluster_name: str | None, server_url: str | None) -> str | None:
+        if not (cluster := self.cluster(cluster_name, server_url)):
+            return None
+        name = cluster["name"]
+        with self._lock:
+            cached = self._tokens.get(name)
+        if cached and time.monotonic() - cached[1] < TOKEN_VALIDATION_TTL:
+            return cached[0]
+
+        # validation is due; pick up tokens the CLI fetched in the meantime
+        token = cache().get(token_key(name))
+        if not token:
+            return None
+        if not (user := whoami(server_url or cluster["serverUrl"], token)):
+            log.info("%s: token is invalid", name)
+            return None
+        cache().set(validated_key(name), user, expire=TOKEN_VALIDATION_TTL)
+        with self._lock:
+            self._tokens[name] = (token, time.monotonic())
+        return token
+
+
+class AgentRequestHandler(socketserver.StreamRequestHandler):
+    server: "AgentServer"
+
+    def handle(self) -> None:
+        try:
+            request = json.loads(self.rfile.readline())
+        except ValueError:
+            return
+        token = None
+        if isinstance(request, dict):
+            cluster, server = request.get("cluster"), request.get("server")
+            token = self.server.store.token(
+                cluster if isinstance(cluster, str) else None,
+                server if isinstance(server, str) else None,
+            )
+        self.wfile.write(json.dumps({"token": token}).encode("utf-8") + b"\n")
+
+
+class AgentServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path) -> None:
+        self.store = TokenStore()
+        super().__init__(str(path), AgentRequestHandler)
+
+
+def agent_running(path: Path) -> bool:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+            return True
+        except OSError:
+            return False
+
+
+def serve(path: Path) -> None:
+    """Serve token requests on the given socket until terminated."""
+    # leftover from an agent that didn't shut down cleanly
+    path.unlink(missing_ok=True)
+    # SIGTERM leaves serve_forever() via SystemExit and cleans up the socket
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    with AgentServer(path) as server:
+        path.chmod(0o600)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,101 @@
+"""Persistent server URL -> cluster index for the exec credential path.
+
+kubectl only tells us the API server URL of the cluster it needs a token for.
+Instead of loading and validating all clusters on every call, a small index
+is kept next to the GraphQL cache and rewritten only if the cluster list
+changes. Like exec_credential.py, this module must stay cheap to import.
+"""
+
+import hashlib
+import json
+import os
+from typing import Any
+from urllib.parse import urlsplit
+
+from openshift_cluster_login.storage import cache
+
+CLUSTER_INDEX_KEY = "cluster_index"
+UNKNOWN_SERVER_TAG = "unknown_server"
+UNKNOWN_SERVER_TTL = 10 * 60  # seconds; how long to remember unknown servers
+DEFAULT_PORTS = {"https": 443, "http": 80}
+
+
+def normalize_server_url(server_url: str) -> str:
+    """Normalize case, default ports and trailing slashes of a server URL."""
+    url = urlsplit(server_url.strip())
+    scheme = url.scheme.lower() or "https"
+    netloc = (url.hostname or "").lower()
+    if url.port and url.port != DEFAULT_PORTS.get(scheme):
+        netloc += f":{url.port}"
+    return f"{scheme}://{netloc}{url.path.rstrip('/')}"
+
+
+def user_clusters_source() -> str:
+    """Return what the OCL_USER_CLUSTERS part of the index depends on."""
+    return os.environ.get("OCL_USER_CLUSTERS_COMMAND") or os.environ.get(
+        "OCL_USER_CLUSTERS", "[]"
+    )
+
+
+def unknown_server_key(server_url: str) -> str:
+    return f"{UNKNOWN_SERVER_TAG}:{normalize_server_url(server_url)}"
+
+
+def lookup_server(server_url: str) -> dict[str, Any] | None:
+    """Return the raw cluster (GraphQL field names) of a server URL.
+
+    Returns None if the index is missing, outdated or doesn't know the server.
+    """
+    index = cache().get(CLUSTER_INDEX_KEY)
+    if not index or index["user_clusters"] != user_clusters_source():
+        return None
+    return index["servers"].get(normalize_server_url(server_url))
+
+
+def indexed_cluster_names() -> list[str] | None:
+    """Return the names of all indexed clusters, None if the index is outdated."""
+    index = cache().get(CLUSTER_INDEX_KEY)
+    if not index or index["user_clusters"] != user_clusters_source():
+        return None
+    return sorted({c["name"] for c in index["servers"].values()})
+
+
+def is_unknown_server(server_url: str) -> bool:
+    return bool(cache().get(unknown_server_key(server_url)))
+
+
+def remember_unknown_server(server_url: str) -> None:
+    cache().set(
+        unknown_server_key(server_url),
+        value=True,
+        expire=UNKNOWN_SERVER_TTL,
+        tag=UNKNOWN_SERVER_TAG,
+    )
+
+
+def update_cluster_index(clusters: list[dict[str, Any]]) -> None:
+    """Rewrite the index if the given raw clusters differ from the indexed ones."""
+    digest = hashlib.sha256(
+        json.dumps(clusters, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+    index = cache().get(CLUSTER_INDEX_KEY)
+    if (
+        index
+        and index["digest"] == digest
+        and index["user_clusters"] == user_clusters_source()
+    ):
+        return
+    servers: dict[str, dict[str, Any]] = {}
+    for c in clusters:
+        # first one wins, like a linear search would
+        servers.setdefault(normalize_server_url(c["serverUrl"]), c)
+    cache().set(
+        CLUSTER_INDEX_KEY,
+        {
+            "digest": digest,
+            "user_clusters": user_clusters_source(),
+            "servers": servers,
+        },
+    )
+    # a server might be known now
+    cache().evict(UNKNOWN_SERVER_TAG)
@@ -0,0 +1,162 @@
+"""Shell completion of cluster and namespace names from a precomputed index.
+
+typer answers a completion request by building the whole CLI, and the
+completion functions load the GraphQL cache. Instead, ocl keeps a sorted text
+file of all names, rewritten whenever the cluster or namespace list is
+fetched (see update_completion_index() in __main__.py). The entry point
+answers the requests for the cluster and namespace arguments by bisecting
+it and leaves everything else to typer. Like exec_credential.py, this module
+must stay cheap to import.
+
+The lines of the index, sorted:
+
+    #<stamp of the query results>
+    C <cluster>
+    N <cluster> <namespace>
+"""
+
+import mmap
+import os
+import shlex
+import sys
+import tempfile
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+
+from openshift_cluster_login.storage import completion_index_file
+
+COMPLETE_VAR = "_OCL_COMPLETE"
+
+
+def index_stamp(path: Path) -> str | None:
+    try:
+        with path.open("rb") as f:
+            line = f.readline()
+    except FileNotFoundError:
+        return None
+    return line[1:].rstrip(b"\n").decode("utf-8") if line.startswith(b"#") else None
+
+
+def write_index(
+    stamp: str, clusters: Iterable[str], namespaces: Iterable[tuple[str, str]]
+) -> None:
+    """Rewrite the index atomically unless it has the given stamp already."""
+    path = completion_index_file()
+    if index_stamp(path) == stamp:
+        return
+    lines = sorted(
+        {f"C {cluster}\n" for cluster in clusters}
+        | {f"N {cluster} {namespace}\n" for cluster, namespace in namespaces}
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(f"#{stamp}\n")
+            f.writelines(lines)
+        Path(tmp).replace(path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _lines(data: bytes | mmap.mmap, prefix: bytes) -> Iterator[bytes]:
+    """Yield the lines starting with prefix; data must be sorted by line."""
+    # find the first line >= prefix; lo is always the start of a line
+    lo, hi = 0, len(data)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        start = data.rfind(b"\n", 0, mid) + 1
+        end = data.find(b"\n", start)
+        if data[start:end] < prefix:
+            lo = end + 1
+        else:
+            hi = start
+    while lo < len(data):
+        end = data.find(b"\n", lo)
+        if not (line := data[lo:end]).startswith(prefix):
+            break
+        yield line
+        lo = end + 1
+
+
+def lookup(prefix: str) -> list[str] | None:
+    """Return the index entries starting with prefix, without the prefix.
+
+    Returns None if there is no index.
+    """
+    try:
+        with completion_index_file().open("rb") as f:
+            if not os.fstat(f.fileno()).st_size:
+                return None
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                encoded = prefix.encode("utf-8")
+                return [
+                    line[len(encoded) :].decode("utf-8")
+                    for line in _lines(data, encoded)
+                ]
+    except FileNotFoundError:
+        return None
+
+
+def complete(args: list[str], incomplete: str) -> list[str] | None:
+    """Complete the cluster and namespace arguments, None to ask typer."""
+    if incomplete.startswith("-") or any(arg.startswith("-") for arg in args):
+        # options might take values, leave them to typer
+        return None
+    if not args:
+        rests = lookup(f"C {incomplete}")
+    elif len(args) == 1 and "" in (lookup(f"C {args[0]}") or []):
+        rests = lookup(f"N {args[0]} {incomplete}")
+    else:
+        # e.g. a user cluster, its namespaces aren't in the index
+        return None
+    return None if rests is None else [incomplete + rest for rest in rests]
+
+
+def _split(line: str) -> list[str] | None:
+    try:
+        return shlex.split(line)
+    except ValueError:
+        return None
+
+
+def completion_args(shell: str) -> tuple[list[str], str] | None:
+    """Return the arguments before the cursor and the incomplete one.
+
+    The same as typer's completion classes, see typer/_completion_classes.py.
+    """
+    if shell == "bash":
+        if (words := _split(os.environ.get("COMP_WORDS", ""))) is None:
+            return None
+        cword = int(os.environ.get("COMP_CWORD", "0"))
+        return words[1:cword], words[cword] if cword < len(words) else ""
+    if shell in {"zsh", "fish"}:
+        line = os.environ.get("_TYPER_COMPLETE_ARGS", "")
+        if (words := _split(line)) is None:
+            return None
+        args = words[1:]
+        if args and not line.endswith(" "):
+            return args[:-1], args[-1]
+        return args, ""
+    return None
+
+
+def fast_complete() -> bool:
+    """Answer a shell completion request; False if typer has to answer it."""
+    instruction = os.environ.get(COMPLETE_VAR, "")
+    shell = instruction.removeprefix("complete_")
+    if shell == instruction or (parsed := completion_args(shell)) is None:
+        return False
+    if (values := complete(*parsed)) is None:
+        return False
+    if shell == "zsh":
+        # names need no escaping
+        items = "\n".join(f'"{value}"' for value in values)
+        output = f"_arguments '*: :(({items}))'" if values else "_files"
+    elif shell == "fish" and os.environ.get("_TYPER_COMPLETE_FISH_ACTION") == "is-args":
+        sys.exit(0 if values else 1)
+    else:
+        output = "\n".join(values)
+    sys.stdout.write(output + "\n")
+    return True
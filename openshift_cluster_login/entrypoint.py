@@ -0,0 +1,28 @@
+"""Console script entry point.
+
+Keep the imports of this module minimal, see exec_credential.py.
+"""
+
+import os
+import sys
+
+from openshift_cluster_login import tracing
+
+
+def main() -> None:
+    # also covers the fast path, which doesn't parse --trace
+    tracing.start_from_env()
+    if "--get-token" in sys.argv[1:]:
+        from openshift_cluster_login.exec_credential import fast_get_token
+
+        if fast_get_token(sys.argv[1:]):
+            return
+    if os.environ.get("_OCL_COMPLETE"):
+        from openshift_cluster_login.completion import fast_complete
+
+        if fast_complete():
+            return
+
+    from openshift_cluster_login.__main__ import app
+
+    app()
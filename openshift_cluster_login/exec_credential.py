@@ -0,0 +1,155 @@
+"""kubectl exec credential plugin fast path.
+
+kubectl runs ``ocl --get-token`` whenever its in-memory ExecCredential expired.
+This module answers that call from the token cache and must stay cheap to
+import: standard library, appdirs and diskcache only (requests is loaded when
+a token is due for validation). Everything else (GraphQL,
+pydantic, Kerberos, the TUI) lives in the full CLI, which is loaded only if the
+cache can't answer.
+"""
+
+import json
+import os
+import sys
+from datetime import UTC, datetime, timedelta
+
+from openshift_cluster_login import tracing
+from openshift_cluster_login.cluster_index import is_unknown_server, lookup_server
+from openshift_cluster_login.storage import agent_socket, cache
+
+AGENT_TIMEOUT = 10  # seconds; must cover a token validation by the agent
+EXEC_CREDENTIAL_TTL = 5 * 60  # seconds; how long kubectl caches the token in-memory
+TOKEN_VALIDATION_TTL = 5 * 60  # seconds; how often to re-validate the token
+
+# tokens which failed validation in this process, e.g. in the fast path
+# before the full CLI takes over; they aren't validated again
+_rejected: set[str] = set()
+
+
+class UnknownServerError(Exception):
+    """No OCL cluster is known for the server URL."""
+
+
+def token_key(cluster_name: str) -> str:
+    return f"token:{cluster_name}"
+
+
+def validated_key(cluster_name: str) -> str:
+    return f"token_validated:{cluster_name}"
+
+
+def exec_credential(token: str) -> str:
+    expiry = datetime.now(tz=UTC) + timedelta(seconds=EXEC_CREDENTIAL_TTL)
+    return json.dumps({
+        "apiVersion": "client.authentication.k8s.io/v1beta1",
+        "kind": "ExecCredential",
+        "status": {
+            "token": token,
+            "expirationTimestamp": expiry.strftime("%Y-%m-%dT%H:%M:%SZ"),
+        },
+    })
+
+
+def exec_info_server() -> str | None:
+    """Return the cluster server URL kubectl passes via KUBERNETES_EXEC_INFO."""
+    exec_info_raw = os.environ.get("KUBERNETES_EXEC_INFO")
+    if not exec_info_raw:
+        return None
+    try:
+        return json.loads(exec_info_raw)["spec"]["cluster"]["server"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def validate_token(cluster_name: str, server_url: str, token: str) -> bool:
+    """Validate the token against the API server and cache the user name."""
+    from openshift_cluster_login.kube_api import whoami
+
+    if token in _rejected:
+        return False
+    with tracing.span("token.validate", cluster=cluster_name) as attrs:
+        attrs["valid"] = bool(user := whoami(server_url, token))
+    if not user:
+        _rejected.add(token)
+        return False
+    cache().set(validated_key(cluster_name), user, expire=TOKEN_VALIDATION_TTL)
+    return True
+
+
+def token_user(cluster_name: str) -> str | None:
+    """Return the user name of the recently validated token of a cluster."""
+    return cache().get(validated_key(cluster_name))
+
+
+def agent_token(cluster_name: str | None, server_url: str | None) -> str | None:
+    """Ask a running ``ocl --agent`` for the token, see agent.py."""
+    path = agent_socket()
+    if not path.exists():
+        return None
+
+    import socket
+
+    request = json.dumps({"cluster": cluster_name, "server": server_url})
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(AGENT_TIMEOUT)
+            sock.connect(str(path))
+            sock.sendall(request.encode("utf-8") + b"\n")
+            with sock.makefile("rb") as f:
+                return json.loads(f.readline())["token"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def cached_token(cluster_name: str | None, server_url: str | None) -> str | None:
+    """Return the valid cached token of a cluster (by name or server URL).
+
+    Raise UnknownServerError if the server URL is cached as unknown.
+    """
+    if not cluster_name:
+        if not server_url:
+            return None
+        if not (cluster := lookup_server(server_url)):
+            if is_unknown_server(server_url):
+                raise UnknownServerError(server_url)
+            return None
+        cluster_name = cluster["name"]
+
+    if not (token := cache().get(token_key(cluster_name))):
+        return None
+    if not token_user(cluster_name) and (
+        not server_url or not validate_token(cluster_name, server_url, token)
+    ):
+        return None
+    return token
+
+
+def fast_get_token(args: list[str]) -> bool:
+    """Answer ``ocl --get-token [CLUSTER]`` without the full CLI.
+
+    A running token agent is asked first, then the token cache. A cached token
+    that is due for validation is validated in-process. Return False if the
+    full CLI must handle the call, e.g. because of additional options, an
+    unknown server or an invalid token.
+    """
+    rest = [arg for arg in args if arg != "--get-token"]
+    if len(rest) > 1 or any(arg.startswith("-") for arg in rest):
+        return False
+
+    cluster_name = rest[0] if rest else None
+    server_url = exec_info_server()
+    with tracing.span("get_token.fast", cluster=cluster_name) as attrs:
+        if token := agent_token(cluster_name, server_url):
+            attrs["source"] = "agent"
+        else:
+            try:
+                token = cached_token(cluster_name, server_url)
+            except UnknownServerError:
+                sys.stderr.write(f"No OCL cluster found for server {server_url}\n")
+                sys.exit(1)
+            if token:
+                attrs["source"] = "cache"
+    if not token:
+        return False
+    sys.stdout.write(exec_credential(token) + "\n")
+    return True
@@ -0,0 +1,172 @@
+"""Starred namespaces and the namespace history.
+
+Both live in one append-only JSON lines file; every line is a change:
+
+    ["star", namespace, cluster]
+    ["unstar", namespace, cluster]
+    ["visit", namespace, cluster, timestamp]
+
+ocl only appends the changes of a session, so processes exiting at the same
+time don't overwrite each other. Once the file has grown well beyond its
+content, it is compacted, i.e. rewritten with the current state. Appending and
+compacting hold favorites_lock().
+
+Visits are ranked by frecency: every visit counts, but its weight halves
+every FRECENCY_HALF_LIFE seconds.
+"""
+
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from openshift_cluster_login import completion
+from openshift_cluster_login.storage import (
+    favorites_file,
+    favorites_lock,
+    history_file,
+    star_file,
+)
+
+NamespaceKey = tuple[str, str]
+
+FRECENCY_HALF_LIFE = 7 * 24 * 60 * 60  # seconds
+MAX_VISITS = 10  # per namespace
+MAX_VISITED = 500  # namespaces; the least frecent ones are forgotten
+COMPACT_MIN_RECORDS = 1000
+
+
+class Favorites:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.stars: set[NamespaceKey] = set()
+        # namespace -> visit timestamps, oldest first
+        self.visits: dict[NamespaceKey, list[float]] = {}
+        self.last_visit: NamespaceKey | None = None
+        self._records = 0
+        self._pending: list[list[Any]] = []
+
+    @classmethod
+    def load(cls, path: Path | None = None) -> "Favorites":
+        favorites = cls(path or favorites_file())
+        if favorites.path.exists():
+            favorites._read()
+        elif path is None:
+            favorites._migrate()
+        return favorites
+
+    def _read(self) -> None:
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._apply(json.loads(line))
+                except (ValueError, TypeError):
+                    # e.g. the last line of a crashed ocl
+                    continue
+                self._records += 1
+
+    def _migrate(self) -> None:
+        """Import star.json and history of older ocl versions."""
+        if star_file().exists():
+            for namespace, cluster in json.loads(star_file().read_text("utf-8")):
+                self.star((namespace, cluster))
+        if history_file().exists() and (name := history_file().read_text("utf-8")):
+            # only the namespace name was kept; find its cluster in the
+            # completion index, drop the visit if that's ambiguous or unknown
+            name = name.strip()
+            clusters = [
+                cluster
+                for cluster, _, namespace in (
+                    entry.partition(" ") for entry in completion.lookup("N ") or []
+                )
+                if namespace == name
+            ]
+            if len(clusters) == 1:
+                self.visit((name, clusters[0]), history_file().stat().st_mtime)
+        self.save()
+
+    def _apply(self, record: list[Any]) -> None:
+        match record:
+            case ["star", str(namespace), str(cluster)]:
+                self.stars.add((namespace, cluster))
+            case ["unstar", str(namespace), str(cluster)]:
+                self.stars.discard((namespace, cluster))
+            case ["visit", str(namespace), str(cluster), float() | int() as when]:
+                visits = self.visits.setdefault((namespace, cluster), [])
+                visits.append(when)
+                del visits[:-MAX_VISITS]
+                self.last_visit = (namespace, cluster)
+            case _:
+                raise ValueError(record)
+
+    def _record(self, record: list[Any]) -> None:
+        self._apply(record)
+        self._pending.append(record)
+
+    def star(self, key: NamespaceKey, *, starred: bool = True) -> None:
+        if (key in self.stars) != starred:
+            self._record(["star" if starred else "unstar", *key])
+
+    def visit(self, key: NamespaceKey, when: float | None = None) -> None:
+        self._record(["visit", *key, when or time.time()])
+
+    def frecency(self, key: NamespaceKey, now: float | None = None) -> float:
+        now = now or time.time()
+        return sum(
+            0.5 ** ((now - when) / FRECENCY_HALF_LIFE)
+            for when in self.visits.get(key, ())
+        )
+
+    def last_selected(self) -> str:
+        """Return the namespace name of the last visit."""
+        return self.last_visit[0] if self.last_visit else ""
+
+    def starred_clusters(self) -> list[str]:
+        return sorted({cluster for _, cluster in self.stars})
+
+    def save(self) -> None:
+        """Append the changes since loading, compact the file if needed."""
+        if not self._pending:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with favorites_lock():
+            with self.path.open("a", encoding="utf-8") as f:
+                f.writelines(
+                    json.dumps(record, separators=(",", ":")) + "\n"
+                    for record in self._pending
+                )
+            self._records += len(self._pending)
+            self._pending.clear()
+            if self._records > max(COMPACT_MIN_RECORDS, 2 * self._size()):
+                self._compact()
+
+    def _size(self) -> int:
+        return len(self.stars) + sum(len(v) for v in self.visits.values())
+
+    def _compact(self) -> None:
+        """Rewrite the file with its current content, the lock must be held."""
+        # other processes might have appended since this one loaded the file
+        current = type(self).load(self.path)
+        now = time.time()
+        visited = sorted(
+            current.visits, key=lambda key: current.frecency(key, now), reverse=True
+        )[:MAX_VISITED]
+        records: list[list[Any]] = [["star", *key] for key in sorted(current.stars)]
+        visits = sorted((when, key) for key in visited for when in current.visits[key])
+        records += [["visit", *key, when] for when, key in visits]
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=f".{self.path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(
+                    json.dumps(record, separators=(",", ":")) + "\n"
+                    for record in records
+                )
+                f.flush()
+                os.fsync(f.fileno())
+            Path(tmp).replace(self.path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self._records = len(records)
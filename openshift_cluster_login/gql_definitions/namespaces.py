@@ -17,28 +17,14 @@ from pydantic import (  # noqa: F401 # pylint: disable=W0611
     Json,
 )
 
-from openshift_cluster_login.gql_definitions.fragments.cluster import Cluster
-
 
 DEFINITION = """
-fragment Cluster on Cluster_v1 {
-  name
-  serverUrl
-  consoleUrl
-  auth {
-    service
-  }
-  spec {
-    hypershift
-  }
-}
-
 query Namespaces {
   namespaces: namespaces_v1 {
     name
     delete
     cluster {
-      ... Cluster
+      name
     }
   }
 }
@@ -51,10 +37,14 @@ class ConfiguredBaseModel(BaseModel):
     )
 
 
+class ClusterV1(ConfiguredBaseModel):
+    name: str = Field(..., alias="name")
+
+
 class NamespaceV1(ConfiguredBaseModel):
     name: str = Field(..., alias="name")
     delete: Optional[bool] = Field(..., alias="delete")
-    cluster: Cluster = Field(..., alias="cluster")
+    cluster: ClusterV1 = Field(..., alias="cluster")
 
 
 class NamespacesQueryData(ConfiguredBaseModel):
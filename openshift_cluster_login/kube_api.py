@@ -0,0 +1,51 @@
+"""The few OpenShift API calls ocl makes itself, without spawning ``oc``."""
+
+import functools
+
+import requests
+
+API_TIMEOUT = 5  # seconds
+
+
+@functools.cache
+def session() -> requests.Session:
+    """Return a process wide session to reuse connections to the API servers."""
+    return requests.Session()
+
+
+def api_url(server_url: str, path: str) -> str:
+    return f"{server_url.rstrip('/')}/{path.lstrip('/')}"
+
+
+def whoami(server_url: str, token: str) -> str | None:
+    """Return the name of the user the token belongs to.
+
+    Like ``oc whoami``, but in-process. Returns None if the token is invalid or
+    the API server isn't reachable.
+    """
+    try:
+        r = session().get(
+            api_url(server_url, "/apis/user.openshift.io/v1/users/~"),
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=API_TIMEOUT,
+        )
+        r.raise_for_status()
+        return r.json()["metadata"]["name"]
+    except (requests.exceptions.RequestException, ValueError, KeyError):
+        return None
+
+
+def project_access(server_url: str, token: str, project: str) -> bool:
+    """Return True if the user of the token may enter the project.
+
+    Like the check of ``oc project``, but in-process.
+    """
+    try:
+        r = session().get(
+            api_url(server_url, f"/apis/project.openshift.io/v1/projects/{project}"),
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=API_TIMEOUT,
+        )
+    except requests.exceptions.RequestException:
+        return False
+    return r.ok
@@ -0,0 +1,272 @@
+"""Native kubeconfig reader/writer.
+
+Spawning ``kubectl config set-*`` per entry rewrites the whole file every
+time. Instead, the file is loaded once, all changes are applied in memory and
+the result is written back once, atomically.
+
+Shells and commands started by ocl get a session kubeconfig (see
+session_kubeconfig()): only the current context of the cluster kubeconfig (see
+KubeConfig.session()), removed when the child exits.
+"""
+
+import os
+import tempfile
+from collections.abc import Generator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+from urllib.parse import urlsplit
+
+import yaml
+
+from openshift_cluster_login.storage import session_dir
+
+# the libyaml bindings are much faster, but optional
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SafeDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+EXEC_USER = "ocl"
+EXEC_API_VERSION = "client.authentication.k8s.io/v1beta1"
+# the kubeconfig entries of ``kubectl config set-*`` are lists of named items
+SECTIONS = {"clusters": "cluster", "users": "user", "contexts": "context"}
+
+
+def kubeconfig_path() -> Path:
+    """Return the kubeconfig file kubectl writes new entries to."""
+    if paths := [p for p in os.environ.get("KUBECONFIG", "").split(os.pathsep) if p]:
+        # kubectl prefers the first existing file of the list
+        return Path(next((p for p in paths if Path(p).exists()), paths[0]))
+    return Path.home() / ".kube" / "config"
+
+
+def server_nickname(server_url: str) -> str:
+    """Return the cluster name ``oc login`` uses for a server.
+
+    E.g. https://api.example.com:6443 -> api-example-com:6443
+    """
+    url = urlsplit(server_url)
+    port = url.port or (443 if url.scheme == "https" else 80)
+    return f"{(url.hostname or '').replace('.', '-')}:{port}"
+
+
+class KubeConfig:
+    def __init__(self, path: Path, config: dict[str, Any]) -> None:
+        self.path = path
+        self.config = config
+        self.changed = False
+        self.config.setdefault("apiVersion", "v1")
+        self.config.setdefault("kind", "Config")
+        self.config.setdefault("preferences", {})
+        for section in SECTIONS:
+            if not self.config.get(section):
+                self.config[section] = []
+
+    @classmethod
+    def load(cls, path: Path | None = None) -> "KubeConfig":
+        path = path or kubeconfig_path()
+        config: dict[str, Any] = {}
+        if path.exists():
+            text = path.read_text(encoding="utf-8")
+            config = yaml.load(text, Loader=SafeLoader) or {}  # noqa: S506
+        return cls(path, config)
+
+    def _items(self, section: str) -> dict[str, dict[str, Any]]:
+        return {item["name"]: item for item in self.config[section]}
+
+    def names(self, section: str) -> set[str]:
+        return {item["name"] for item in self.config[section]}
+
+    def get(self, section: str, name: str) -> dict[str, Any] | None:
+        item = self._items(section).get(name)
+        return item[SECTIONS[section]] if item else None
+
+    def _set(self, section: str, name: str, values: dict[str, Any]) -> None:
+        """Merge values into an entry like ``kubectl config set-*`` does."""
+        key = SECTIONS[section]
+        if item := self._items(section).get(name):
+            merged = {**(item.get(key) or {}), **values}
+            if merged == item.get(key):
+                return
+            item[key] = merged
+        else:
+            self.config[section].append({"name": name, key: values})
+        self.changed = True
+
+    def _delete(self, section: str, names: set[str]) -> None:
+        items = [item for item in self.config[section] if item["name"] not in names]
+        if len(items) != len(self.config[section]):
+            self.config[section] = items
+            self.changed = True
+
+    def set_cluster(self, name: str, server: str) -> None:
+        self._set("clusters", name, {"server": server})
+
+    def set_user(self, name: str, values: dict[str, Any]) -> None:
+        self._set("users", name, values)
+
+    def set_context(self, name: str, cluster: str, user: str) -> None:
+        self._set("contexts", name, {"cluster": cluster, "user": user})
+
+    def _use_context(self, name: str, values: dict[str, Any]) -> None:
+        self._set("contexts", name, values)
+        if self.config.get("current-context") != name:
+            self.config["current-context"] = name
+            self.changed = True
+
+    def namespace(self) -> str | None:
+        """Return the namespace of the current context."""
+        name = self.config.get("current-context")
+        context = self.get("contexts", name) if name else None
+        return (context or {}).get("namespace")
+
+    def set_login(self, server_url: str, user: str, token: str, namespace: str) -> None:
+        """Log in to the server like ``oc login`` does, with the same names."""
+        cluster = server_nickname(server_url)
+        user_name = f"{user}/{cluster}"
+        self.set_cluster(cluster, server_url)
+        self.set_user(user_name, {"token": token})
+        self._use_context(
+            f"{namespace}/{cluster}/{user}",
+            {"cluster": cluster, "user": user_name, "namespace": namespace},
+        )
+
+    def set_namespace(self, namespace: str) -> bool:
+        """Switch to the namespace like ``oc project`` does.
+
+        Returns False if there is no current context.
+        """
+        name = self.config.get("current-context")
+        if not name or (context := self.get("contexts", name)) is None:
+            return False
+        user = str(context.get("user", "")).split("/", 1)[0]
+        self._use_context(
+            f"{namespace}/{context.get('cluster')}/{user}",
+            {**context, "namespace": namespace},
+        )
+        return True
+
+    def set_exec_user(self) -> None:
+        """Add the shared ``ocl --get-token`` exec credential plugin user."""
+        self.set_user(
+            EXEC_USER,
+            {
+                "exec": {
+                    "apiVersion": EXEC_API_VERSION,
+                    "command": "ocl",
+                    "args": ["--get-token"],
+                    "env": None,
+                    "interactiveMode": "IfAvailable",
+                    "provideClusterInfo": True,
+                }
+            },
+        )
+
+    def exec_contexts(self) -> dict[str, str]:
+        """Return the contexts using the ocl exec user and their cluster names."""
+        return {
+            item["name"]: item["context"]["cluster"]
+            for item in self.config["contexts"]
+            if (item.get("context") or {}).get("user") == EXEC_USER
+        }
+
+    def prune_exec_contexts(self, keep: set[str]) -> list[str]:
+        """Remove ocl exec contexts (and their clusters) not listed in keep."""
+        contexts = self.exec_contexts()
+        pruned = sorted(name for name in contexts if name not in keep)
+        clusters = {contexts[name] for name in pruned}
+        self._delete("contexts", set(pruned))
+        # other contexts might still use a cluster
+        in_use = {
+            (item.get("context") or {}).get("cluster")
+            for item in self.config["contexts"]
+        }
+        self._delete("clusters", clusters - in_use)
+        if self.config.get("current-context") in pruned:
+            self.config["current-context"] = ""
+        return pruned
+
+    def session(self, namespace: str = "") -> dict[str, Any]:
+        """Return a config with only the current context, its cluster and user.
+
+        The namespace of the context is replaced if given.
+        """
+        name = self.config.get("current-context")
+        if not name or (context := self.get("contexts", name)) is None:
+            return self.config
+        if namespace:
+            context = {**context, "namespace": namespace}
+        return {
+            "apiVersion": self.config["apiVersion"],
+            "kind": self.config["kind"],
+            "preferences": self.config["preferences"],
+            "clusters": [
+                item
+                for item in self.config["clusters"]
+                if item["name"] == context.get("cluster")
+            ],
+            "users": [
+                item
+                for item in self.config["users"]
+                if item["name"] == context.get("user")
+            ],
+            "contexts": [{"name": name, "context": context}],
+            "current-context": name,
+        }
+
+    def save(self) -> None:
+        """Write the config atomically if anything changed."""
+        if not self.changed:
+            return
+        # replace the target of a symlinked config, not the symlink
+        path = self.path.resolve()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                yaml.dump(self.config, f, Dumper=SafeDumper, default_flow_style=False)
+                f.flush()
+                os.fsync(f.fileno())
+            Path(tmp).replace(path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+        self.changed = False
+
+
+@contextmanager
+def session_kubeconfig(
+    config: dict[str, Any], name: str
+) -> Generator[Path, None, None]:
+    """Write config for a child process, remove it afterwards.
+
+    The file name starts with the PID of ocl, so the files of crashed or killed
+    sessions can be recognized and are swept here.
+    """
+    directory = session_dir()
+    sweep_sessions(directory)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=f"{os.getpid()}.{name}.")
+    path = Path(tmp)
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            yaml.dump(config, f, Dumper=SafeDumper, default_flow_style=False)
+        yield path
+    finally:
+        path.unlink(missing_ok=True)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # exists, but belongs to another user
+        return True
+    return True
+
+
+def sweep_sessions(directory: Path) -> None:
+    """Remove the session kubeconfigs of ocl processes which are gone."""
+    for path in directory.iterdir():
+        pid = path.name.split(".", 1)[0]
+        if pid.isdigit() and not _alive(int(pid)):
+            path.unlink(missing_ok=True)
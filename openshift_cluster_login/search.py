@@ -0,0 +1,184 @@
+"""Incremental fuzzy filtering for the namespace picker.
+
+A query matches if its characters appear in the item text in the same order
+(case-insensitive), like fuzzyfinder. Typing usually narrows the previous
+query, so the previous result is the candidate set for the new one instead of
+all items; results of recent queries are kept for backspacing.
+
+Results are item indexes in display order. The order is established once and
+maintained per item (see reorder()), never by sorting a result again.
+
+The index is built once: the casefolded texts and a bitmask of the characters
+of each text. An item whose mask lacks a character of the query cannot match,
+so most items are rejected without running the regex. ranked() scores only as
+many matches as needed to fill the screen.
+
+An IncrementalFilter may be used from a worker thread: queries are
+serialized, and reorder() only queues the move for the next query, so it never
+waits for a running one.
+"""
+
+import bisect
+import heapq
+import itertools
+import queue
+import re
+import string
+import threading
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Any, Generic, TypeVar
+
+T = TypeVar("T")
+
+RESULT_CACHE_SIZE = 64
+# one bit per common character, everything else shares the remaining bits
+CHAR_BITS = {
+    c: 1 << i for i, c in enumerate(string.ascii_lowercase + string.digits + "-_.")
+}
+OTHER_BITS = 64 - len(CHAR_BITS)
+
+
+def narrows(query: str, previous: str) -> bool:
+    """Return True if every match of query also matches previous."""
+    # previous must be a subsequence of query
+    chars = iter(query)
+    return all(c in chars for c in previous)
+
+
+def pattern(query: str) -> re.Pattern[str]:
+    # "a[^b]*b" matches like "a.*?b", but without backtracking
+    return re.compile(
+        "".join(f"[^{c}]*{c}" if i else c for i, c in enumerate(map(re.escape, query)))
+    )
+
+
+def char_mask(text: str) -> int:
+    mask = 0
+    for c in set(text):
+        mask |= CHAR_BITS.get(c) or 1 << (len(CHAR_BITS) + ord(c) % OTHER_BITS)
+    return mask
+
+
+class IncrementalFilter(Generic[T]):
+    def __init__(
+        self,
+        items: list[T],
+        text: Callable[[T], str],
+        key: Callable[[T], Any],
+    ) -> None:
+        """Filter items by text, results are ordered by key."""
+        self.items = items
+        self._texts = [text(item).casefold() for item in items]
+        self._masks = [char_mask(t) for t in self._texts]
+        self._key = key
+        # the keys as of the last query, items might change meanwhile
+        self._keys = [key(item) for item in items]
+        self._moved: queue.SimpleQueue[tuple[int, Any]] = queue.SimpleQueue()
+        self._lock = threading.Lock()
+        order = sorted(range(len(items)), key=self._keys.__getitem__)
+        # query -> result; the most recently used query comes last
+        self._results: OrderedDict[str, list[int]] = OrderedDict({"": order})
+
+    def _candidates(self, query: str) -> list[int]:
+        """Return the smallest cached result the query narrows."""
+        return min(
+            (
+                result
+                for previous, result in self._results.items()
+                if narrows(query, previous)
+            ),
+            key=len,
+        )
+
+    def _apply_moves(self) -> None:
+        moved: dict[int, Any] = {}
+        while True:
+            try:
+                index, key = self._moved.get_nowait()
+            except queue.Empty:
+                break
+            moved[index] = key
+        if not moved:
+            return
+        for index, key in moved.items():
+            self._keys[index] = key
+        # take all moved items out first, the others are still in order
+        for result in self._results.values():
+            present = [i for i in moved if i in result]
+            for index in present:
+                result.remove(index)
+            for index in present:
+                bisect.insort(result, index, key=self._keys.__getitem__)
+
+    def _filter(self, query: str) -> list[int]:
+        if (result := self._results.get(query)) is None:
+            search = pattern(query).search
+            texts, masks = self._texts, self._masks
+            mask = char_mask(query)
+            result = [
+                i
+                for i in self._candidates(query)
+                if masks[i] & mask == mask and search(texts[i])
+            ]
+            self._results[query] = result
+            if len(self._results) > RESULT_CACHE_SIZE:
+                # never evict all items ("")
+                oldest = next(q for q in self._results if q)
+                del self._results[oldest]
+        self._results.move_to_end(query)
+        return result
+
+    def filter(self, query: str) -> list[int]:
+        """Return the indexes of the matching items in display order."""
+        with self._lock:
+            self._apply_moves()
+            return list(self._filter(query.casefold()))
+
+    def _best(self, result: list[int], query: str, k: int) -> list[int]:
+        """Return the positions of the k best matches in result."""
+        texts = self._texts
+        # a prefix match is as good as it gets, the first k of them win
+        prefixed = (p for p, i in enumerate(result) if texts[i].startswith(query))
+        if len(best := list(itertools.islice(prefixed, k))) == k:
+            return best
+        # the next best are substring matches, ordered by their start
+        exact = [p for p, i in enumerate(result) if query in texts[i]]
+        if len(exact) >= k:
+            return heapq.nsmallest(
+                k, exact, key=lambda p: (texts[result[p]].find(query), p)
+            )
+        search = pattern(query).search
+
+        def score(position: int) -> tuple[int, int, int]:
+            text = texts[result[position]]
+            match = search(text)
+            start, end = match.span() if match else (0, len(text) + 1)
+            return end - start, start, position
+
+        return heapq.nsmallest(k, range(len(result)), key=score)
+
+    def ranked(self, query: str, k: int) -> list[int]:
+        """Return filter(query) with its k best matches first.
+
+        The closer the matched characters are to each other and to the start,
+        the better. The other matches follow in display order.
+        """
+        query = query.casefold()
+        with self._lock:
+            self._apply_moves()
+            result = self._filter(query)
+            if not query or k <= 0:
+                return list(result)
+            best = self._best(result, query, k)
+            chosen = set(best)
+            return [result[p] for p in best] + [
+                i for p, i in enumerate(result) if p not in chosen
+            ]
+
+    def reorder(self, index: int) -> None:
+        """Move an item to its new position after its key changed.
+
+        The move takes effect with the next query.
+        """
+        self._moved.put((index, self._key(self.items[index])))
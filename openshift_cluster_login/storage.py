@@ -0,0 +1,100 @@
+"""On-disk state (config files, the cache, runtime files), created on first use.
+
+Nothing here touches the filesystem at import time; the kubectl exec
+credential path imports this module on every kubectl invocation.
+"""
+
+import functools
+import os
+import stat
+import tempfile
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from appdirs import AppDirs
+
+if TYPE_CHECKING:
+    from diskcache import Cache
+    from flufl.lock import Lock
+
+appdirs = AppDirs("ocl", "ca-net")
+
+
+@functools.cache
+def user_config_dir() -> Path:
+    path = Path(appdirs.user_config_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def history_file() -> Path:
+    """The last selected namespace, replaced by favorites_file()."""
+    return user_config_dir() / "history"
+
+
+def star_file() -> Path:
+    """The starred namespaces, replaced by favorites_file()."""
+    return user_config_dir() / "star.json"
+
+
+def favorites_file() -> Path:
+    return user_config_dir() / "favorites.jsonl"
+
+
+@functools.cache
+def cache() -> "Cache":
+    from diskcache import Cache
+
+    return Cache(directory=str(Path(appdirs.user_cache_dir) / "gql_cache"))
+
+
+def completion_index_file() -> Path:
+    return Path(appdirs.user_cache_dir) / "completion_index"
+
+
+def runtime_dir() -> Path:
+    """Per-user directory for sockets and other short-lived files."""
+    if xdg_runtime_dir := os.environ.get("XDG_RUNTIME_DIR"):
+        path = Path(xdg_runtime_dir) / "ocl"
+    else:
+        path = Path(tempfile.gettempdir()) / f"ocl-{os.getuid()}"
+    path.mkdir(mode=0o700, parents=True, exist_ok=True)
+    # the directory holds the agent socket, locks and kubeconfigs; in a
+    # shared /tmp, another user might have created it first (like ssh-agent)
+    st = path.lstat()
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        msg = f"{path} must be a directory owned by you with mode 0700"
+        raise PermissionError(msg)
+    return path
+
+
+def session_dir() -> Path:
+    """The session kubeconfigs of the running shells and commands."""
+    path = runtime_dir() / "sessions"
+    path.mkdir(mode=0o700, exist_ok=True)
+    return path
+
+
+def cluster_lock(cluster_name: str) -> "Lock":
+    """Inter-process lock for logins to a cluster.
+
+    Logins to different clusters don't block each other.
+    """
+    from flufl.lock import Lock
+
+    return Lock(
+        str(runtime_dir() / f"{cluster_name}.lock"), lifetime=60, default_timeout=65
+    )
+
+
+def favorites_lock() -> "Lock":
+    """Inter-process lock for changes to the favorites file."""
+    from flufl.lock import Lock
+
+    return Lock(str(runtime_dir() / "favorites.lock"), lifetime=10, default_timeout=15)
+
+
+def agent_socket() -> Path:
+    if sock := os.environ.get("OCL_AGENT_SOCK"):
+        return Path(sock)
+    return runtime_dir() / "agent.sock"
@@ -0,0 +1,170 @@
+"""Per-phase timing traces.
+
+Tracing is enabled with ``--trace FILE`` or ``OCL_TRACE=FILE`` and records
+nested spans, e.g. GraphQL queries, IdP probing, Kerberos logins, ``oc``
+subprocesses and lock waits, with attributes like cache hits. Spans are
+appended to the file when the process exits, so one file can collect many
+invocations (e.g. all ``--get-token`` calls of kubectl):
+
+* ``*.json``: Chrome trace event format (chrome://tracing, Perfetto). The
+  closing bracket of the event array is optional and therefore omitted.
+* anything else: one JSON object per span and line.
+
+``OCL_TRACE_PROFILE=cpu`` additionally dumps cProfile stats to
+``FILE.<pid>.prof``, ``OCL_TRACE_PROFILE=memory`` the top tracemalloc
+allocations to ``FILE.<pid>.memory.txt``.
+
+Like exec_credential.py, this module must stay cheap to import. Nothing is
+written to stdout; it's reserved for the ExecCredential of ``--get-token``.
+"""
+
+import atexit
+import fcntl
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+TRACEMALLOC_TOP = 30
+
+
+class Tracer:
+    def __init__(self, path: Path, profile: str | None) -> None:
+        self.path = path
+        self.profile = profile
+        self.spans: list[dict[str, Any]] = []
+        self._ids = itertools.count(1)
+        self._local = threading.local()
+        self._profiler: Any = None
+        self._root = self._start("ocl", {"argv": sys.argv[1:]})
+
+        if profile == "cpu":
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        elif profile == "memory":
+            import tracemalloc
+
+            tracemalloc.start()
+
+    def _stack(self) -> list[dict[str, Any]]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def _start(self, name: str, attributes: dict[str, Any]) -> dict[str, Any]:
+        stack = self._stack()
+        span = {
+            "name": name,
+            "id": next(self._ids),
+            # spans of worker threads start a new tree
+            "parent": stack[-1]["id"] if stack else None,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "start": time.time(),
+            "_start": time.perf_counter(),
+            "attributes": attributes,
+        }
+        stack.append(span)
+        return span
+
+    def _end(self, span: dict[str, Any]) -> None:
+        span["duration_ms"] = (time.perf_counter() - span.pop("_start")) * 1000
+        self._stack().remove(span)
+        self.spans.append(span)
+
+    @contextmanager
+    def span(
+        self, name: str, attributes: dict[str, Any]
+    ) -> Generator[dict[str, Any], None, None]:
+        span = self._start(name, attributes)
+        try:
+            yield attributes
+        except BaseException as e:
+            attributes["error"] = type(e).__name__
+            raise
+        finally:
+            self._end(span)
+
+    def _dump_profile(self) -> None:
+        if self._profiler:
+            self._profiler.disable()
+            self._profiler.dump_stats(f"{self.path}.{os.getpid()}.prof")
+        elif self.profile == "memory":
+            import tracemalloc
+
+            self._root["attributes"]["peak_memory"] = tracemalloc.get_traced_memory()[1]
+            stats = tracemalloc.take_snapshot().statistics("lineno")
+            Path(f"{self.path}.{os.getpid()}.memory.txt").write_text(
+                "\n".join(str(stat) for stat in stats[:TRACEMALLOC_TOP]) + "\n",
+                encoding="utf-8",
+            )
+            tracemalloc.stop()
+
+    def flush(self) -> None:
+        """End the root span and append all spans to the trace file."""
+        self._end(self._root)
+        self._dump_profile()
+        chrome = self.path.suffix == ".json"
+        if chrome:
+            lines = [json.dumps(chrome_event(span), default=str) for span in self.spans]
+            data = "".join(f"{line},\n" for line in lines)
+        else:
+            data = "".join(json.dumps(span, default=str) + "\n" for span in self.spans)
+        with self.path.open("a", encoding="utf-8") as f:
+            # concurrent invocations write one after the other, so only the
+            # first one finds the file empty and writes the header
+            fcntl.flock(f, fcntl.LOCK_EX)
+            if chrome and f.seek(0, os.SEEK_END) == 0:
+                data = "[\n" + data
+            f.write(data)
+
+
+def chrome_event(span: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "name": span["name"],
+        "ph": "X",
+        "ts": span["start"] * 1_000_000,
+        "dur": span["duration_ms"] * 1000,
+        "pid": span["pid"],
+        "tid": span["tid"],
+        "args": span["attributes"],
+    }
+
+
+_tracer: Tracer | None = None
+
+
+def start(path: str | Path, profile: str | None = None) -> None:
+    """Enable tracing for the rest of the process; the first call wins."""
+    global _tracer  # noqa: PLW0603
+    if _tracer is not None:
+        return
+    _tracer = Tracer(Path(path), profile or os.environ.get("OCL_TRACE_PROFILE"))
+    atexit.register(_tracer.flush)
+
+
+def enabled() -> bool:
+    return _tracer is not None
+
+
+def start_from_env() -> None:
+    if path := os.environ.get("OCL_TRACE"):
+        start(path)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Generator[dict[str, Any], None, None]:
+    """Record a span; attributes can be added to the yielded dict."""
+    if _tracer is None:
+        yield attributes
+        return
+    with _tracer.span(name, attributes) as attrs:
+        yield attrs
@@ -1,25 +1,43 @@
 from __future__ import annotations
 
+import asyncio
 import os
 from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any, ClassVar, Generic
 
-from fuzzyfinder.main import fuzzyfinder
-from textual import on
+from textual import on, work
 from textual.app import App, ComposeResult
 from textual.binding import Binding, BindingType
 from textual.containers import Container
+from textual.coordinate import Coordinate
 from textual.message import Message
 from textual.reactive import reactive
 from textual.widget import Widget
 from textual.widgets import DataTable, Input, Static
-from textual.widgets.data_table import CellType
+from textual.widgets.data_table import CellType, RowDoesNotExist, RowKey
+
+from openshift_cluster_login.search import IncrementalFilter
 
 if TYPE_CHECKING:
-    from textual.widgets.data_table import ColumnKey, RowKey
+    from collections.abc import Callable
+
+    from textual.widgets.data_table import ColumnKey, Row
 
+TITLE = "OpenShift Cluster Login"
 STAR = ":star:"
 NOT_STAR = ""
+# wait for the next keystroke before filtering (seconds)
+FILTER_DEBOUNCE = 0.05
+# how long a row must stay highlighted before its cluster is warmed up (seconds)
+WARM_UP_DELAY = 0.5
+# DataTable internals replaced by NamespaceList.show_rows(), as of Textual 8.2
+BULK_SWAP_INTERNALS = (
+    "_data",
+    "_row_locations",
+    "_clear_caches",
+    "_update_count",
+    "_require_update_dimensions",
+)
 
 
 @dataclass
@@ -27,6 +45,7 @@ class Namespace:
     namespace: str
     cluster: str
     starred: bool = False
+    frecency: float = 0.0
 
 
 NamespaceKey = tuple[str, str]
@@ -91,74 +110,153 @@ class NamespaceList(DataTable, Generic[CellType]):
     ) -> None:
         super().__init__(*args, **kwargs)
         self.namespaces = namespaces
-        self.namespaces_by_key: dict[NamespaceKey, Namespace] = {
-            (ns.namespace, ns.cluster): ns for ns in namespaces
-        }
-        self._hidden_data: dict[RowKey, dict[ColumnKey, CellType]] = {}
-
-    def default_sort(self) -> None:
-        self.sort(
-            self.star_column,
-            self.namespace_column,
-            key=lambda c: c[1] if not c[0] else f"1{c[1]}",
+        self.search = self.index(namespaces)
+        self._row_keys = [self.row_key(ns) for ns in namespaces]
+        self._row_index = {key: i for i, key in enumerate(self._row_keys)}
+        # all rows, including the hidden ones
+        self._all_data: dict[RowKey, dict[ColumnKey, str]] = {}
+        self._all_rows: dict[RowKey, Row] = {}
+        self._shown_filter = ""
+        self._bulk_swap = all(hasattr(self, name) for name in BULK_SWAP_INTERNALS)
+        # star toggles the next index() might have missed
+        self._toggled: list[Namespace] = []
+
+    @staticmethod
+    def index(namespaces: list[Namespace]) -> IncrementalFilter[Namespace]:
+        """Build the search index.
+
+        Starred namespaces come first, then the frequently and recently
+        selected ones, then by name.
+        """
+        return IncrementalFilter(
+            namespaces,
+            text=lambda ns: f"{ns.namespace} {ns.cluster}",
+            key=lambda ns: (not ns.starred, -ns.frecency, ns.namespace, ns.cluster),
         )
 
+    @staticmethod
+    def row_key(ns: Namespace) -> RowKey:
+        return RowKey(f"{ns.cluster}/{ns.namespace}")
+
     def on_mount(self) -> None:
         self.star_column = self.add_column(STAR)
         self.namespace_column = self.add_column("Namespace")
         self.cluster_column = self.add_column("Cluster")
-        for ns in self.namespaces:
-            self.add_row(
-                STAR if ns.starred else NOT_STAR,
-                ns.namespace,
-                ns.cluster,
-            )
-        self.default_sort()
-
-    async def watch_namespace_filter(self) -> None:
+        self._add_rows(self.search.filter(""))
+
+    def _add_rows(self, indexes: list[int]) -> None:
+        for i in indexes:
+            ns = self.namespaces[i]
+            key = self._row_keys[i]
+            cells = (STAR if ns.starred else NOT_STAR, ns.namespace, ns.cluster)
+            self.add_row(*cells, key=key.value)
+            self._all_data[key] = dict(zip(self.columns, cells, strict=True))
+            self._all_rows[key] = self.rows[key]
+
+    def merge(self, namespaces: list[Namespace]) -> list[Namespace]:
+        """Return namespaces, reusing the known ones along with their star."""
+        known = {self.row_key(ns): ns for ns in self.namespaces}
+        return [known.get(self.row_key(ns), ns) for ns in namespaces]
+
+    def replace(
+        self, namespaces: list[Namespace], search: IncrementalFilter[Namespace]
+    ) -> None:
+        """Show other namespaces, keeping the filter and the cursor position.
+
+        Rows of known namespaces are reused, only new ones are added.
+        """
+        self.workers.cancel_group(self, "filter")
+        cursor_key = self._row_locations.get_key(self.cursor_row)
+        self.namespaces, self.search = namespaces, search
+        self._row_keys = [self.row_key(ns) for ns in namespaces]
+        self._row_index = {key: i for i, key in enumerate(self._row_keys)}
+        for ns in self._toggled:
+            if (i := self._row_index.get(self.row_key(ns))) is not None:
+                search.reorder(i)
+        self._toggled.clear()
+        for key in self._all_rows.keys() - self._row_index.keys():
+            del self._all_data[key], self._all_rows[key]
+        self._add_rows([
+            i for i, key in enumerate(self._row_keys) if key not in self._all_rows
+        ])
+        self.show_matches()
+        if cursor_key and (row := self._row_locations.get(cursor_key)) is not None:
+            self.move_cursor(row=row)
+
+    def show_rows(self, indexes: list[int]) -> None:
+        """Show the given namespaces, in the given order, in one go.
+
+        Unlike remove_row()/add_row(), this reuses the rows created on mount;
+        they are neither measured again nor sorted. That replaces DataTable
+        internals (BULK_SWAP_INTERNALS); a Textual version without them gets
+        the much slower clear() and add_row() instead.
+        """
+        keys = [self._row_keys[i] for i in indexes]
+        if self._bulk_swap:
+            self._data = {key: self._all_data[key] for key in keys}
+            self.rows = {key: self._all_rows[key] for key in keys}
+            self._row_locations = type(self._row_locations)({
+                key: row for row, key in enumerate(keys)
+            })
+            self._clear_caches()
+            self._update_count += 1
+            # no new rows to measure, but the virtual size changed
+            self._require_update_dimensions = True
+            self.check_idle()
+        else:
+            self.clear(columns=False)
+            for key in keys:
+                self.add_row(*self._all_data[key].values(), key=key.value)
+        if self.cursor_row >= len(keys):
+            self.cursor_coordinate = Coordinate(max(len(keys) - 1, 0), 0)
+        self.refresh()
+
+    @property
+    def visible_rows(self) -> int:
+        return self.scrollable_content_region.height - self.header_height
+
+    def show_matches(self) -> None:
+        """Show the namespaces matching the filter now, the best ones on top."""
+        self.workers.cancel_group(self, "filter")
+        self.show_rows(self.search.ranked(self.namespace_filter, self.visible_rows))
+        self._shown_filter = self.namespace_filter
+
+    @work(exclusive=True, group="filter")
+    async def filter_rows(self, query: str) -> None:
+        """Show the namespaces matching query, the best ones on top.
+
+        A newer query cancels this one, so only the latest query is shown.
+        """
+        await asyncio.sleep(FILTER_DEBOUNCE)
+        # only the visible rows are ranked
+        indexes = await asyncio.to_thread(self.search.ranked, query, self.visible_rows)
+        self.show_rows(indexes)
+        self._shown_filter = query
+
+    def apply_filter(self) -> None:
+        """Show the matches of the current filter if they are still pending."""
+        if self._shown_filter != self.namespace_filter:
+            self.show_matches()
+
+    def watch_namespace_filter(self) -> None:
         """Watch for changes to the namespace filter."""
-        all_data = self._data | self._hidden_data
-
-        def get_searchable_text(row_key):
-            row_data = all_data[row_key]
-            return f"{row_data[self.namespace_column]} {row_data[self.cluster_column]}"
-
-        row_keys_to_display = (
-            set(
-                fuzzyfinder(
-                    self.namespace_filter,
-                    all_data.keys(),
-                    accessor=get_searchable_text,
-                    sort_results=False,
-                )
-            )
-            if self.namespace_filter
-            else set(all_data.keys())
-        )
-
-        for row_key_to_hide in set(self._data.keys()) - row_keys_to_display:
-            self._hidden_data[row_key_to_hide] = self._data[row_key_to_hide]
-            self.remove_row(row_key_to_hide)
-
-        for row_key_to_display in row_keys_to_display & set(self._hidden_data.keys()):
-            self.add_row(*self._hidden_data[row_key_to_display].values())
-            del self._hidden_data[row_key_to_display]
-        self.default_sort()
+        if self._all_rows:
+            self.filter_rows(self.namespace_filter)
 
     def toggle_star(self) -> None:
         """Handle the toggle star event."""
         current_row_key = self._row_locations.get_key(self.cursor_coordinate.row)
         if not current_row_key:
             return
-        if self.get_cell(current_row_key, self.star_column) == STAR:
-            self.update_cell(current_row_key, self.star_column, NOT_STAR)
-        else:
-            self.update_cell(current_row_key, self.star_column, STAR)
-
-        _, namespace, cluster = self.get_row_at(self.cursor_coordinate.row)
-        ns = self.namespaces_by_key[namespace, cluster]
+        index = self._row_index[current_row_key]
+        ns = self.namespaces[index]
         ns.starred = not ns.starred
-        self.default_sort()
+        self._toggled.append(ns)
+        star = STAR if ns.starred else NOT_STAR
+        self._all_data[current_row_key][self.star_column] = star
+        self.update_cell(current_row_key, self.star_column, star)
+        self.search.reorder(index)
+        self.filter_rows(self.namespace_filter)
 
 
 class NamespaceFilter(Input):
@@ -300,6 +398,11 @@ class NamespacePicker(Widget):
         self, message: NamespaceFilter.Submitted
     ) -> None:
         """Handle the submitted event in the namespace filter."""
+        self.namespace_list.apply_filter()
+        if not self.namespace_list.row_count:
+            # nothing to select (yet)
+            message.stop()
+            return
         _, self.selected_namespace, self.selected_cluster = (
             self.namespace_list.get_row_at(self.namespace_list.cursor_coordinate.row)
         )
@@ -309,6 +412,8 @@ class NamespacePicker(Widget):
         self, message: NamespaceFilter.ToggleStar
     ) -> None:
         """Handle the mark as favorite event in the namespace filter."""
+        if not self.namespace_list.row_count:
+            return
         self.namespace_list.toggle_star()
         _, self.selected_namespace, self.selected_cluster = (
             self.namespace_list.get_row_at(self.namespace_list.cursor_coordinate.row)
@@ -334,9 +439,13 @@ class OclApp(App):
         self.selected_namespace: str = ""
         self.selected_cluster: str = ""
         self.last_selected: str = ""
+        # loads the current namespaces while the (cached) ones are shown
+        self.load_namespaces: Callable[[], list[Namespace]] | None = None
+        # starts logging in to a cluster in the background, must not block
+        self.warm_up: Callable[[str], None] | None = None
 
     def compose(self) -> ComposeResult:
-        yield Static("OpenShift Cluster Login", classes="title")
+        yield Static(TITLE, classes="title")
         yield NamespacePicker(self.namespaces, self.last_selected)
         yield Static(
             "↑/↓: Navigate • Enter: Select • Ctrl+S: Toggle Favorite • Esc: Quit",
@@ -345,6 +454,48 @@ class OclApp(App):
 
     def on_mount(self) -> None:
         self.namespace_picker = self.query_one(NamespacePicker)
+        if self.load_namespaces:
+            self.refresh_namespaces(self.load_namespaces)
+
+    def show_status(self, status: str) -> None:
+        self.query_one(".title", Static).update(
+            f"{TITLE} • {status}" if status else TITLE
+        )
+
+    @work(thread=True, exclusive=True, group="refresh")
+    def refresh_namespaces(self, load: Callable[[], list[Namespace]]) -> None:
+        """Load the namespaces and show them in place of the current ones."""
+        namespace_list = self.query_one(NamespaceList)
+        self.call_from_thread(self.show_status, "refreshing namespaces …")
+        try:
+            namespaces = namespace_list.merge(load())
+        except Exception as e:  # noqa: BLE001
+            self.call_from_thread(self.show_status, f"refresh failed: {e}")
+            return
+        search = NamespaceList.index(namespaces)
+        self.call_from_thread(namespace_list.replace, namespaces, search)
+        self.namespaces = namespaces
+        self.call_from_thread(self.show_status, "")
+
+    @on(NamespaceList.RowHighlighted)
+    def handle_namespace_row_highlighted(
+        self, message: NamespaceList.RowHighlighted
+    ) -> None:
+        if not self.warm_up:
+            return
+        try:
+            _, _, cluster = message.data_table.get_row(message.row_key)
+        except RowDoesNotExist:
+            # replaced meanwhile
+            return
+        self.warm_up_cluster(cluster)
+
+    @work(exclusive=True, group="warm-up")
+    async def warm_up_cluster(self, cluster: str) -> None:
+        """Warm up the cluster unless the highlight moves on meanwhile."""
+        await asyncio.sleep(WARM_UP_DELAY)
+        if self.warm_up:
+            self.warm_up(cluster)
 
     @on(NamespaceFilter.Submitted)
     async def handle_namespace_filter_submitted(
@@ -355,7 +506,5 @@ class OclApp(App):
         await self.action_quit()
 
 
-app = OclApp(watch_css=True, css_path=os.environ.get("OCL_CSS_PATH", None))
-
 if __name__ == "__main__":
-    app.run()
+    OclApp(watch_css=True, css_path=os.environ.get("OCL_CSS_PATH", None)).run()